@@ -1,13 +1,17 @@
-import static_frame as sf
-import numpy as np
+from collections import Counter
 from itertools import product
 import typing as tp
 
 from chess_ai.core.Pieces.piece import Queen, King, Pawn, Rook, Knight, Bishop, Piece, PieceType
 from chess_ai.core.Mechanics.color import Color, get_opposite_color
-from chess_ai.core.Mechanics.point import Point, check_bounds
+from chess_ai.core.Mechanics.point import Point, SQUARES, NONE, check_bounds
+from chess_ai.core.Mechanics.bitboard import (BB_SQUARES, EMPTY, FULL, FILES, RANKS, square_index, popcount, lsb,
+        iter_squares)
+from chess_ai.core.Mechanics.attack_tables import (KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN,
+        BEYOND, QUEEN_LINES, rook_attacks, bishop_attacks, queen_attacks)
+from chess_ai.core.Mechanics import piece_square, zobrist
 from chess_ai.core.Mechanics.status import Status
-from chess_ai.core.Mechanics.move import Move, Castle
+from chess_ai.core.Mechanics.move import Move, SanMove, Castle, BoardMove, IllegalMove, AmbiguousMove
 from chess_ai.core.Utils.reference import Ref
 from chess_ai.core.Game.screenshot import Screenshot
 
@@ -39,12 +43,57 @@ BOARD_STR = '''
 '''
 
 
+SLIDING_PIECES = (PieceType.Queen, PieceType.Rook, PieceType.Bishop)
+PROMOTIONS = (PieceType.Queen, PieceType.Rook, PieceType.Bishop, PieceType.Knight)
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# FEN piece letters, lowercase for Black
+_FEN_PIECES: tp.Dict[str, tp.Type[Piece]] = dict(k=King, q=Queen, r=Rook, b=Bishop, n=Knight, p=Pawn)
+_FEN_CHARS: tp.Dict[PieceType, str] = {
+        PieceType.King: 'k', PieceType.Queen: 'q', PieceType.Rook: 'r',
+        PieceType.Bishop: 'b', PieceType.Knight: 'n', PieceType.Pawn: 'p',
+}
+
+# Castling right bits with their FEN letter and the king & rook squares they depend on, in FEN order
+_FEN_CASTLING = (
+        ('K', zobrist.WHITE_KINGSIDE, 4, 7),
+        ('Q', zobrist.WHITE_QUEENSIDE, 4, 0),
+        ('k', zobrist.BLACK_KINGSIDE, 60, 63),
+        ('q', zobrist.BLACK_QUEENSIDE, 60, 56),
+)
+
+
+class UndoRecord(tp.NamedTuple):
+    '''Everything Board.pop needs to exactly revert a move applied by Board.push'''
+    move: BoardMove
+    piece: Piece
+    is_first_move: bool
+    captured: tp.Optional[Piece]
+    captured_index: int
+    captured_slots: tp.Optional[tp.Tuple[int, int]]
+    en_passant: Point
+    rook: tp.Optional[Rook]
+    rook_is_first_move: bool
+    promoted: tp.Optional[Piece]
+    pawn_slot: int
+    zobrist_key: int
+    halfmove_clock: int
+    attacks: tp.List[int]
+    attackers: tp.List[int]
+
+
+class LegalityMasks(tp.NamedTuple):
+    '''Per-position restrictions on where a color's pieces may legally move'''
+    checkers: int
+    check_mask: int
+    pins: tp.Dict[int, int]
+
+
 class Board:
     COL_MAP = {0: 'A', 1: 'B', 2: 'C', 3: 'D', 4: 'E', 5: 'F', 6: 'G', 7: 'H'}
 
     def _gen_board(self):
-        _board = np.full((8, 8), fill_value=None)
-
         for row, col in product(range(8), range(8)):
             color = Color.White if row <= 1 else Color.Black
 
@@ -67,39 +116,291 @@ class Board:
             if piece is not None:
                 if piece.piece_type == PieceType.King:
                     self._kings[color] = piece
-                else:
-                    self._pieces[color][piece.piece_type].add(piece)
-
-                _board[row, col] = piece
 
-        return sf.Frame.from_records(_board, columns=tuple('ABCDEFGH'))
+                self._teams[color].append(piece)
+                self._pieces[color][piece.piece_type].append(piece)
+                self._put(piece, square_index(row, col))
 
     def __init__(self):
-        self._enpassant_location: Ref[Point] = Ref(Point())
+        self._init_empty()
+        self._gen_board()
+        self._zobrist_key ^= zobrist.CASTLING_KEYS[self._castling_rights()]
+        self._update_scores()
+
+    def _init_empty(self):
+        self._enpassant_location: Ref[Point] = Ref(NONE)
 
         self._kings: tp.Dict[Color, King] = {}
 
-        self._pieces: tp.Dict[Color, tp.Dict[PieceType, tp.Set[Piece]]] = {}
+        # Piece lists per color, and per color & type. They're kept in a stable order, pieces taken off the board
+        # by push go back into the same spot on pop
+        self._teams: tp.Dict[Color, tp.List[Piece]] = {color: [] for color in Color}
+        self._pieces: tp.Dict[Color, tp.Dict[PieceType, tp.List[Piece]]] = {}
         for color in Color:
-            piece_collection: tp.Dict[PieceType, tp.Set[Piece]] = {}
-            for piece_type in (pt for pt in PieceType if pt != PieceType.King):
-                piece_collection[piece_type] = set()
+            piece_collection: tp.Dict[PieceType, tp.List[Piece]] = {}
+            for piece_type in PieceType:
+                piece_collection[piece_type] = []
             self._pieces[color] = piece_collection
 
-        self._board: sf.Frame = self._gen_board()
-
+        # Mailbox for O(1) square lookups, mirrored by one bitboard per color & piece type
+        self._squares: tp.List[tp.Optional[Piece]] = [None] * 64
+        self._bitboards: tp.Dict[Color, tp.Dict[PieceType, int]] = {
+                color: {piece_type: EMPTY for piece_type in PieceType} for color in Color
+        }
+        self._occupancy: tp.Dict[Color, int] = {color: EMPTY for color in Color}
+
+        # Attack maps, also kept up to date by _put/_take: the squares attacked by the piece on each square, and
+        # the pieces (of both colors) attacking each square. A color's attacker count is the popcount of the latter
+        # masked with its occupancy
+        self._attacks: tp.List[int] = [EMPTY] * 64
+        self._attackers: tp.List[int] = [EMPTY] * 64
+
+        # Piece placement is hashed by _put/_take, the rest of the position is folded in below
+        self._zobrist_key: int = 0
+
+        self.turn: Color = Color.White
+        # Plies since the last capture or pawn move, i.e. the last irreversible move
+        self.halfmove_clock: int = 0
+        # Starts at 1, incremented after every Black move
+        self.fullmove_number: int = 1
+        self._move_stack: tp.List[UndoRecord] = []
+        self._legality_masks_cache: tp.Dict[Color, tp.Tuple[int, LegalityMasks]] = {}
+
+        # Key and legality masks of the position the pieces' move caches were last brought up to date in, used to
+        # work out which caches a move leaves stale. None when unknown
+        self._cache_baseline: tp.Optional[tp.Tuple[int, tp.Dict[Color, LegalityMasks]]] = None
+        # Move cache hits & misses, plus how many caches each targeted invalidation cleared or kept
+        self.move_cache_stats: tp.Counter[str] = Counter()
+
+        # Material & piece-square sums per color (see piece_square), kept up to date by _put/_take, and the game
+        # phase. The scores blend them by phase, they're brought up to date by push & pop
+        self._middlegame_scores: tp.Dict[Color, int] = {color: 0 for color in Color}
+        self._endgame_scores: tp.Dict[Color, int] = {color: 0 for color in Color}
+        self._phase: int = 0
         self.white_score: float = 0.0
         self.black_score: float = 0.0
 
+    @classmethod
+    def from_fen(cls, fen: str) -> 'Board':
+        '''
+        Sets up a board from a FEN string. The move clocks may be left out, in which case they start at 0 and 1.
+
+        Castling rights map onto the kings' and rooks' first move flags, so a right is only kept when its king and
+        rook are on their starting squares. Pawns on their starting row may double-step, others may not.
+        '''
+        fields = fen.split()
+        if not 4 <= len(fields) <= 6:
+            raise ValueError(f'Invalid FEN, expected 4 to 6 fields: {fen!r}')
+        placement, turn, castling, en_passant = fields[:4]
+
+        rows = placement.split('/')
+        if len(rows) != 8 or turn not in ('w', 'b'):
+            raise ValueError(f'Invalid FEN: {fen!r}')
+
+        board = cls.__new__(cls)
+        board._init_empty()
+
+        # Rank 1 first, so the piece lists come out in square order like those of a freshly generated board
+        for row, row_str in enumerate(reversed(rows)):
+            col = 0
+            for char in row_str:
+                if char.isdigit():
+                    col += int(char)
+                    continue
+
+                piece_class = _FEN_PIECES.get(char.lower())
+                if piece_class is None or col > 7:
+                    raise ValueError(f'Invalid FEN placement: {placement!r}')
+
+                color = Color.White if char.isupper() else Color.Black
+                index = square_index(row, col)
+                piece = piece_class(color, board, SQUARES[index])
+
+                if piece_class is Pawn:
+                    piece._is_first_move = row == (1 if color == Color.White else 6)
+                elif piece_class is King or piece_class is Rook:
+                    # Set back below for the ones the castling rights say haven't moved
+                    piece._is_first_move = False
+                    if piece_class is King:
+                        board._kings[color] = piece
+
+                board._teams[color].append(piece)
+                board._pieces[color][piece.piece_type].append(piece)
+                # The attack maps are built in one go once every piece is down
+                board._put(piece, index, False)
+                col += 1
+
+            if col != 8:
+                raise ValueError(f'Invalid FEN placement: {placement!r}')
+
+        if len(board._kings) != 2:
+            raise ValueError(f'Invalid FEN, both sides need a king: {fen!r}')
+
+        if castling != '-':
+            for char, _, king_index, rook_index in _FEN_CASTLING:
+                if char in castling:
+                    for index, piece_type in ((king_index, PieceType.King), (rook_index, PieceType.Rook)):
+                        piece = board._squares[index]
+                        if piece is not None and piece.piece_type == piece_type:
+                            piece._is_first_move = True
+
+        occupied = board.occupied
+        for index in iter_squares(occupied):
+            board._set_attacks(index, board._piece_attacks(board._squares[index], index, occupied))
+
+        board.turn = Color.White if turn == 'w' else Color.Black
+        if en_passant != '-':
+            point = Point.from_str(en_passant)
+            if not point.is_valid():
+                raise ValueError(f'Invalid FEN en passant square: {en_passant!r}')
+            board._enpassant_location.update(point)
+
+        try:
+            board.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+            board.fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+        except ValueError:
+            raise ValueError(f'Invalid FEN move clocks: {fen!r}') from None
+
+        board._zobrist_key = board._compute_zobrist_key()
+        board._update_scores()
+        return board
+
+    def to_fen(self) -> str:
+        '''The position as a FEN string'''
+        squares = self._squares
+        rows = []
+        for row in range(7, -1, -1):
+            row_str = ''
+            empty = 0
+            for piece in squares[row * 8:row * 8 + 8]:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row_str += str(empty)
+                    empty = 0
+                char = _FEN_CHARS[piece.piece_type]
+                row_str += char.upper() if piece.color == Color.White else char
+            if empty:
+                row_str += str(empty)
+            rows.append(row_str)
+
+        rights = self._castling_rights()
+        castling = ''.join(char for char, right, _, _ in _FEN_CASTLING if rights & right) or '-'
+
+        en_passant = self._enpassant_location.value
+        en_passant_str = en_passant.to_str().lower() if en_passant.is_valid() else '-'
+
+        turn = 'w' if self.turn == Color.White else 'b'
+        return f'{"/".join(rows)} {turn} {castling} {en_passant_str} {self.halfmove_clock} {self.fullmove_number}'
+
     @property
     def screenshot(self):
         return Screenshot.from_board(self)
 
-    def _key_to_call(self, key):
-        if isinstance(key, Point):
-            row = key.x
-            col = key.y
-        elif isinstance(key, tuple):
+    @property
+    def occupied(self) -> int:
+        '''Bitboard of every occupied square'''
+        return self._occupancy[Color.White] | self._occupancy[Color.Black]
+
+    def occupancy(self, color: Color) -> int:
+        '''Bitboard of every square occupied by a color'''
+        return self._occupancy[color]
+
+    @property
+    def zobrist_key(self) -> int:
+        '''64-bit hash of the position: placement, side to move, castling rights and en passant'''
+        return self._zobrist_key
+
+    def bitboard(self, color: Color, piece_type: PieceType) -> int:
+        '''Bitboard of every square occupied by a color's pieces of a given type'''
+        return self._bitboards[color][piece_type]
+
+    def _put(self, piece: Piece, index: int, update_attacks: bool = True) -> None:
+        '''Places a piece on an empty square'''
+        bit = BB_SQUARES[index]
+        self._squares[index] = piece
+        self._bitboards[piece.color][piece.piece_type] |= bit
+        self._occupancy[piece.color] |= bit
+        self._zobrist_key ^= zobrist.PIECE_KEYS[piece.color][piece.piece_type][index]
+        middlegame, endgame, phase = piece_square.SCORES[piece.color][piece.piece_type][index]
+        self._middlegame_scores[piece.color] += middlegame
+        self._endgame_scores[piece.color] += endgame
+        self._phase += phase
+
+        if update_attacks:
+            # The new piece cuts off every ray that used to pass through its square
+            for slider in self._sliders_attacking(index):
+                self._set_attacks(slider, self._attacks[slider] & ~BEYOND[slider][index])
+            self._set_attacks(index, self._piece_attacks(piece, index, self.occupied))
+
+    def _take(self, index: int, update_attacks: bool = True) -> tp.Optional[Piece]:
+        '''Lifts whatever piece is on a square off of the board'''
+        piece = self._squares[index]
+        if piece is not None:
+            mask = ~BB_SQUARES[index]
+            self._squares[index] = None
+            self._bitboards[piece.color][piece.piece_type] &= mask
+            self._occupancy[piece.color] &= mask
+            self._zobrist_key ^= zobrist.PIECE_KEYS[piece.color][piece.piece_type][index]
+            middlegame, endgame, phase = piece_square.SCORES[piece.color][piece.piece_type][index]
+            self._middlegame_scores[piece.color] -= middlegame
+            self._endgame_scores[piece.color] -= endgame
+            self._phase -= phase
+
+            if update_attacks:
+                self._set_attacks(index, EMPTY)
+
+                # Rays that ended on the lifted piece now continue past its square, up to the next blocker
+                occupied = self.occupied
+                for slider in self._sliders_attacking(index):
+                    beyond = BEYOND[slider][index]
+                    blockers = beyond & occupied
+                    if blockers:
+                        blocker = lsb(blockers) if index > slider else blockers.bit_length() - 1
+                        beyond &= ~BEYOND[slider][blocker]
+                    self._set_attacks(slider, self._attacks[slider] | beyond)
+        return piece
+
+    @staticmethod
+    def _piece_attacks(piece: Piece, index: int, occupied: int) -> int:
+        piece_type = piece.piece_type
+        if piece_type is PieceType.Pawn:
+            return PAWN_ATTACKS[piece.color][index]
+        if piece_type is PieceType.Knight:
+            return KNIGHT_ATTACKS[index]
+        if piece_type is PieceType.King:
+            return KING_ATTACKS[index]
+        if piece_type is PieceType.Rook:
+            return rook_attacks(index, occupied)
+        if piece_type is PieceType.Bishop:
+            return bishop_attacks(index, occupied)
+        return queen_attacks(index, occupied)
+
+    def _sliders_attacking(self, index: int) -> tp.List[int]:
+        '''Squares of the rooks, bishops and queens (of either color) attacking a square'''
+        squares = self._squares
+        return [attacker for attacker in iter_squares(self._attackers[index])
+                if squares[attacker].piece_type in SLIDING_PIECES]
+
+    def _set_attacks(self, index: int, attacks: int) -> None:
+        '''Replaces the squares attacked by the piece on a square, updating the attackers of every changed square'''
+        old = self._attacks[index]
+        if old == attacks:
+            return
+        self._attacks[index] = attacks
+
+        # Hot path, so the changed squares are walked inline rather than with iter_squares
+        bit = BB_SQUARES[index]
+        attackers = self._attackers
+        changed = old ^ attacks
+        while changed:
+            low = changed & -changed
+            attackers[low.bit_length() - 1] ^= bit
+            changed ^= low
+
+    def _key_to_index(self, key) -> tp.Optional[int]:
+        if isinstance(key, tuple):
             if len(key) != 2:
                 raise KeyError('Unknown key type')
 
@@ -108,6 +409,9 @@ class Board:
 
             row, col = key
 
+        elif isinstance(key, Point):
+            return key.index if key.index >= 0 else None
+
         elif isinstance(key, str):
             row = int(key[1]) - 1
             col = Point.KEY_MAP[key[0]]
@@ -115,123 +419,276 @@ class Board:
             raise KeyError('Unknown key type')
 
         if check_bounds(row) and check_bounds(col):
-            return row, col
+            return square_index(row, col)
         return None
 
-    # @property
-    # def iloc(self):
-    #     class ILocInterface:
-    #         def __init__(self, frame):
-    #             self.frame = frame
-
-    #         def __getitem__(self, key):
-    #             return self.frame.iloc[key[0]-1, key[0]-1]
-
-    #     return ILocInterface(self._board)
-
-
-    def _find_target_piece(self, move: Move) -> Piece:
-
-        row = move.row_helper - 1 if move.row_helper is not None else None
-        col = Point.KEY_MAP[move.col_helper] if move.col_helper is not None else None
-
-        for piece in self._pieces[move.color][move.piece]:
-            if col is None and row is None and piece.can_attack(move.destination):
-                return piece
-            elif col is not None and row is None:
-                if piece.pos.y == col and piece.can_attack(move.destination):
-                    return piece
-            elif col is None and row is not None:
-                if piece.pos.x == row and piece.can_attack(move.destination):
-                    return piece
+    def _find_target_piece(self, move: tp.Union[Move, SanMove]) -> Piece:
+        '''
+        The piece a SAN move moves. Candidates are looked up from the destination square: the pieces of the moving
+        color & type that reach it, narrowed down by the move's file & rank hints and then to those that may
+        legally move there (not pinned away from it, and answering any check).
+
+        Raises IllegalMove when no piece fits, AmbiguousMove when more than one does.
+        '''
+        color = move.color
+        piece_type = move.piece
+        destination = move.destination
+        if destination is None or not destination.is_valid():
+            raise IllegalMove(f'No destination square: {move.move}')
+
+        index = destination.index
+        bit = BB_SQUARES[index]
+        own = self._bitboards[color][piece_type]
+
+        if self._occupancy[color] & bit:
+            raise IllegalMove(f'{destination.to_str()} holds a {color.value} piece: {move.move}')
+
+        is_en_passant = False
+        if piece_type is PieceType.Pawn:
+            if 'x' in move.move or move.en_passant:
+                # Pawns capturing onto a square sit where an enemy pawn on that square would attack
+                is_en_passant = destination is self._enpassant_location.value
+                if not is_en_passant and not self._occupancy[get_opposite_color(color)] & bit:
+                    raise IllegalMove(f'Nothing to capture on {destination.to_str()}: {move.move}')
+                candidates = PAWN_ATTACKS[get_opposite_color(color)][index] & own
+            elif self.occupied & bit:
+                raise IllegalMove(f'{destination.to_str()} is occupied: {move.move}')
             else:
-                if piece.pos == Point(row, col) and piece.can_attack(move.destination):
-                    return piece
-
-        breakpoint()
-        raise RuntimeError(f'No target found for move: {move}')
-
-
-    def parse_points_from_move(self, move: Move) -> tp.Tuple[Piece, Point, tp.Optional[PieceType]]:
-
+                step = -8 if color == Color.White else 8
+                behind = index + step
+                candidates = own & BB_SQUARES[behind] if 0 <= behind < 64 else EMPTY
+                # A double step, from the starting row over an empty square
+                double_step_row = 3 if color == Color.White else 4
+                if not candidates and destination.x == double_step_row and self._squares[behind] is None:
+                    candidates = own & BB_SQUARES[behind + step]
+        else:
+            candidates = own & self._piece_type_attacks(piece_type, color, index, self.occupied)
+
+        if move.col_helper is not None:
+            candidates &= FILES[Point.KEY_MAP[move.col_helper]]
+        if move.row_helper is not None:
+            candidates &= RANKS[move.row_helper - 1]
+
+        legal = []
+        if candidates:
+            masks = self.legality_masks(color)
+            for candidate in iter_squares(candidates):
+                piece = self._squares[candidate]
+                if is_en_passant:
+                    # The captured pawn isn't on the destination, leave that to the pawn's own move generation
+                    if piece.is_valid_move(destination):
+                        legal.append(piece)
+                elif bit & masks.check_mask & masks.pins.get(candidate, FULL):
+                    legal.append(piece)
+
+        if len(legal) == 1:
+            return legal[0]
+        if not legal:
+            raise IllegalMove(f'No {color.value} {piece_type.value} can move to {destination.to_str()}: {move.move}')
+        raise AmbiguousMove(f'{len(legal)} {color.value} {piece_type.value}s can move to {destination.to_str()}: '
+                            f'{move.move}')
+
+    @staticmethod
+    def _piece_type_attacks(piece_type: PieceType, color: Color, index: int, occupied: int) -> int:
+        '''
+        Squares a piece of a given type & color on `index` attacks. Attacks are symmetric, so these are also the
+        squares such a piece attacks `index` from (pawns aside, whose attacks mirror by color)
+        '''
+        if piece_type is PieceType.Knight:
+            return KNIGHT_ATTACKS[index]
+        if piece_type is PieceType.King:
+            return KING_ATTACKS[index]
+        if piece_type is PieceType.Rook:
+            return rook_attacks(index, occupied)
+        if piece_type is PieceType.Bishop:
+            return bishop_attacks(index, occupied)
+        if piece_type is PieceType.Queen:
+            return queen_attacks(index, occupied)
+        return PAWN_ATTACKS[color][index]
+
+    def parse_points_from_move(self, move: tp.Union[Move, SanMove]) -> tp.Tuple[Piece, Point, tp.Optional[PieceType]]:
+        '''
+        Resolves a SAN move to the piece it moves, where to and what it promotes to.
+
+        Raises IllegalMove or AmbiguousMove when the move doesn't name exactly one legal move.
+        '''
         if move.piece == PieceType.King:
             king = self.get_king(move.color)
 
             if move.castle in (Castle.Queenside, Castle.Kingside):
-                direction = 2 if Castle.Kingside else -2
-                return king, Point(king.pos.x, king.pos.y + direction), None
+                direction = 2 if move.castle == Castle.Kingside else -2
+                destination = Point(king.pos.x, king.pos.y + direction)
+            else:
+                destination = move.destination
 
-            return king, move.destination, None
+            if destination not in king.get_all_valid_moves():
+                raise IllegalMove(f'The {move.color.value} King can\'t move to {destination.to_str()}: {move.move}')
+            return king, destination, None
 
         else:
             target = self._find_target_piece(move)
             return target, move.destination, move.upgrade
 
     def __getitem__(self, key) -> tp.Optional[Piece]:
-        key = self._key_to_call(key)
-        if key is None:
+        # Fast paths for points and the (row, col) lookups the pieces make while walking the board
+        if key.__class__ is Point:
+            return self._squares[key.index] if key.index >= 0 else None
+
+        if key.__class__ is tuple and len(key) == 2:
+            row, col = key
+            if 0 <= row <= 7 and 0 <= col <= 7 and row.__class__ is int:
+                return self._squares[row * 8 + col]
+
+        index = self._key_to_index(key)
+        if index is None:
             return None
-        return self._board.iloc[key]
+        return self._squares[index]
 
     def remove_piece(self, key):
-        key = self._key_to_call(key)
-        if key is not None:
-            piece = self._board.iloc[key]
+        index = self._key_to_index(key)
+        if index is not None:
+            castling_rights = self._castling_rights()
+            en_passant_file = self._en_passant_file()
+
+            piece = self._take(index)
             if piece is not None:
+                self._teams[piece.color].remove(piece)
                 self._pieces[piece.color][piece.piece_type].remove(piece)
-                self._board = self._board.assign.iloc[key](None)
                 del piece
 
+                # Removing a rook or pawn can change the castling and en passant parts of the hash
+                self._zobrist_key ^= zobrist.CASTLING_KEYS[castling_rights ^ self._castling_rights()]
+                if en_passant_file != self._en_passant_file():
+                    for col in (en_passant_file, self._en_passant_file()):
+                        if col != -1:
+                            self._zobrist_key ^= zobrist.EN_PASSANT_KEYS[col]
+                self._update_scores()
+
     def get_king(self, color: Color) -> King:
         return self._kings[color]
 
-    def get_team(self, color: Color) -> tp.Set[Piece]:
-        team: tp.Set[Piece] = set()
-        for collection in self._pieces[color].values():
-            team.update(collection)
-        return team | {self._kings[color]}
+    def get_team(self, color: Color) -> tp.List[Piece]:
+        '''Every piece of a color still on the board. This is the board's own list, don't modify it'''
+        return self._teams[color]
+
+    def get_pieces(self, color: Color, piece_type: PieceType) -> tp.List[Piece]:
+        '''Every piece of a color & type still on the board. This is the board's own list, don't modify it'''
+        return self._pieces[color][piece_type]
+
+    @property
+    def en_passant(self) -> Point:
+        '''Square a pawn can currently capture onto en passant, or an invalid point'''
+        return self._enpassant_location.value
 
     def is_enpassant(self, p: Point) -> bool:
         '''Checks if a given location is subject to en passant'''
         return self._enpassant_location() == p
 
     def is_attackable(self, p: Point, opposing_color: Color) -> bool:
-        for enemy in self.get_team(opposing_color):
-            if enemy.can_attack(p, ignore_color=True):
-                return True
-        return False
-
-    def move_exposes_king(self, piece: Piece, move: Point, color: Color) -> bool:
-        piece_x = piece.pos.x
-        piece_y = piece.pos.y
-        move_x = move.x
-        move_y = move.y
-
-        # Temporarily move piece
-        original_occupant = self._board.iloc[move_x, move_y]
-        self._board = self._board.assign.iloc[piece_x, piece_y](None)
-        self._board = self._board.assign.iloc[move_x, move_y](piece)
-
-        king_pos = self.get_king(color).pos
+        return self.is_attacked(p.index, opposing_color)
+
+    def attack_count(self, index: int, color: Color) -> int:
+        '''Number of a color's pieces attacking a square'''
+        return popcount(self._attackers[index] & self._occupancy[color])
+
+    def attackers_of(self, index: int, color: Color, occupied: tp.Optional[int] = None) -> int:
+        '''Bitboard of a color's pieces attacking a square, given an occupancy (the current board by default)'''
+        if occupied is None:
+            return self._attackers[index] & self._occupancy[color]
+
+        pieces = self._bitboards[color]
+
+        # A pawn attacks this square from wherever a pawn of the other color standing here would attack
+        attackers = (KNIGHT_ATTACKS[index] & pieces[PieceType.Knight] |
+                     KING_ATTACKS[index] & pieces[PieceType.King] |
+                     PAWN_ATTACKS[get_opposite_color(color)][index] & pieces[PieceType.Pawn])
+
+        queens = pieces[PieceType.Queen]
+        rooks = pieces[PieceType.Rook] | queens
+        if rooks:
+            attackers |= rook_attacks(index, occupied) & rooks
+        bishops = pieces[PieceType.Bishop] | queens
+        if bishops:
+            attackers |= bishop_attacks(index, occupied) & bishops
+
+        return attackers
+
+    def legality_masks(self, color: Color) -> LegalityMasks:
+        '''
+        Check evasion and pin masks for a color's pieces, computed once per position.
+
+        A piece's legal moves are its pseudo-legal moves & check mask & its pin ray (if pinned).
+        '''
+        cached = self._legality_masks_cache.get(color)
+        if cached is not None and cached[0] == self._zobrist_key:
+            return cached[1]
+
+        king_index = lsb(self._bitboards[color][PieceType.King])
+        enemy = get_opposite_color(color)
+        enemy_pieces = self._bitboards[enemy]
+        own = self._occupancy[color]
+        occupied = own | self._occupancy[enemy]
+
+        checkers = self.attackers_of(king_index, enemy)
+
+        # Enemy sliders that would see the king through any number of friendly pieces pin the only piece in between
+        pins: tp.Dict[int, int] = {}
+        queens = enemy_pieces[PieceType.Queen]
+        snipers = (rook_attacks(king_index, self._occupancy[enemy]) & (enemy_pieces[PieceType.Rook] | queens) |
+                   bishop_attacks(king_index, self._occupancy[enemy]) & (enemy_pieces[PieceType.Bishop] | queens))
+        for sniper in iter_squares(snipers & ~checkers):
+            between = BETWEEN[king_index][sniper]
+            blockers = between & occupied
+            if blockers & (blockers - 1) == 0 and blockers & own:
+                pins[lsb(blockers)] = between | BB_SQUARES[sniper]
+
+        if not checkers:
+            check_mask = FULL
+        elif checkers & (checkers - 1) == 0:
+            # A slider can be captured or blocked along its ray, anything else can only be captured
+            check_mask = checkers | BETWEEN[king_index][lsb(checkers)]
+        else:
+            # Double check, only the king can move
+            check_mask = EMPTY
+
+        masks = LegalityMasks(checkers, check_mask, pins)
+        self._legality_masks_cache[color] = (self._zobrist_key, masks)
+        return masks
+
+    def legal_moves(self) -> tp.List[BoardMove]:
+        '''Every legal move for the side to move, with one move per promotion choice'''
+        moves = []
+        for piece in self._teams[self.turn]:
+            start = piece.pos
+            promotion_row = 7 if piece.color == Color.White else 0
+            for end in piece.get_all_valid_moves():
+                if piece.piece_type == PieceType.Pawn and end.x == promotion_row:
+                    moves.extend(BoardMove(start, end, promotion) for promotion in PROMOTIONS)
+                else:
+                    moves.append(BoardMove(start, end))
+        return moves
 
-        king_exposed = False
-        for enemy in self.get_team(get_opposite_color(color)):
-            # Ignore the potential attack of a piece that might be removed
-            if enemy.can_attack(king_pos) and enemy.pos != move:
-                king_exposed = True
-                break
+    def is_attacked(self, index: int, by_color: Color, occupied: tp.Optional[int] = None) -> bool:
+        return bool(self.attackers_of(index, by_color, occupied))
 
-        # Put piece back
-        self._board = self._board.assign.iloc[piece_x, piece_y](piece)
-        self._board = self._board.assign.iloc[move_x, move_y](original_occupant)
+    def move_exposes_king(self, piece: Piece, move: Point, color: Color) -> bool:
+        self.push(BoardMove(piece.pos, move))
+        king_exposed = self.get_king(color).in_check
+        self.pop()
 
         return king_exposed
 
     def get_board_status(self, color: Color) -> Status:
-        total_moves = 0
+        team = self.get_team(color)
 
-        # If any piece has a valid move, the game is in progress
-        for piece in self.get_team(color):
+        # If any piece has a valid move, the game is in progress. Moves still cached from earlier turns settle
+        # that without generating anything
+        for piece in team:
+            if piece._valid_moves_cache:
+                self.move_cache_stats['hits'] += 1
+                return Status.InProgress
+
+        for piece in team:
             if len(piece.get_all_valid_moves()) > 0:
                 return Status.InProgress
 
@@ -243,78 +700,242 @@ class Board:
         return Status.Stalemate
 
     def perform_move(self, piece: Piece, to: Point, promotion: tp.Optional[PieceType] = None):
-        starting_pos = piece.pos
+        '''Moves a piece, see `push`. Game asks its policy for a promotion piece, the board defaults to a Queen'''
+        self.push(BoardMove(piece.pos, to, promotion))
+
+    def push(self, move: BoardMove) -> None:
+        '''
+        Applies a move to the board, recording everything needed to exactly revert it with `pop`.
+
+        Pawns reaching the final row without an explicit promotion are promoted to a Queen.
+        '''
+        start = move.start.index
+        end = move.end.index
+        to = move.end
+
+        piece = self._squares[start]
+        is_first_move = piece.is_first_move
         en_passant_start = self._enpassant_location.value
+        zobrist_key = self._zobrist_key
+        castling_rights = self._castling_rights()
+        en_passant_file = self._en_passant_file()
+
+        # The attack maps are updated in place below, pop puts these untouched copies back
+        attacks = self._attacks
+        attackers = self._attackers
+        self._attacks = attacks[:]
+        self._attackers = attackers[:]
 
         # Update piece's internal state
         piece.perform_move(to, self._enpassant_location)
 
-        # Move piece on board
-        self.remove_piece(to)
-        self._board = self._board.assign.iloc[to.x, to.y](piece)
+        captured_index = end
+        captured = self._take(end)
+
+        # An en passant was performed!
+        if piece.piece_type == PieceType.Pawn and to == en_passant_start:
+            captured_index = square_index(move.start.x, to.y)
+            captured = self._take(captured_index)
 
-        # Clear starting loction
-        self._board = self._board.assign.iloc[starting_pos.x, starting_pos.y](None)
+        captured_slots = None
+        if captured is not None:
+            team = self._teams[captured.color]
+            pieces = self._pieces[captured.color][captured.piece_type]
+            captured_slots = (team.index(captured), pieces.index(captured))
+            del team[captured_slots[0]]
+            del pieces[captured_slots[1]]
 
-        x_movement = to.x - starting_pos.x
-        y_movement = to.y - starting_pos.y
+        # Move piece on board
+        self._put(self._take(start), end)
 
         # A castle was performed!
-        if piece.piece_type == PieceType.King and abs(y_movement) == 2:
-            x = piece.pos.x
-            if y_movement > 0:
+        rook = None
+        rook_is_first_move = False
+        if piece.piece_type == PieceType.King and abs(to.y - move.start.y) == 2:
+            x = to.x
+            if to.y > move.start.y:
                 rook_pos_y = 7
                 rook_to_y = 5
             else:
                 rook_pos_y = 0
                 rook_to_y = 3
 
-            rook_pos = Point(x, rook_pos_y)
-            rook_to = Point(x, rook_to_y)
-            rook = self[rook_pos]
-
-            rook.perform_move(rook_to, self._enpassant_location)
+            rook = self._take(square_index(x, rook_pos_y))
+            rook_is_first_move = rook.is_first_move
+            rook.perform_move(Point(x, rook_to_y), self._enpassant_location)
+            self._put(rook, square_index(x, rook_to_y))
 
-            self.remove_piece(rook_to)
-            self._board = self._board.assign.iloc[x, rook_to_y](rook)
-            self._board = self._board.assign.iloc[x, rook_pos_y](None)
+        # Check for pawn promotion
+        promoted = None
+        pawn_slot = -1
+        if piece.piece_type == PieceType.Pawn and to.x in (0, 7):
+            color = piece.color
+            promoted = Piece.from_piece_type(move.promotion or PieceType.Queen, color, self, to)
+
+            self._take(end)
+            self._put(promoted, end)
+
+            # The promoted piece takes the pawn's spot in the team list
+            team = self._teams[color]
+            team[team.index(piece)] = promoted
+            pawns = self._pieces[color][piece.piece_type]
+            pawn_slot = pawns.index(piece)
+            del pawns[pawn_slot]
+            self._pieces[color][promoted.piece_type].append(promoted)
+
+        halfmove_clock = self.halfmove_clock
+        if captured is not None or piece.piece_type == PieceType.Pawn:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+
+        if self.turn == Color.Black:
+            self.fullmove_number += 1
+        self.turn = get_opposite_color(self.turn)
+        self._zobrist_key ^= zobrist.SIDE_KEY ^ zobrist.CASTLING_KEYS[castling_rights ^ self._castling_rights()]
+        if en_passant_file != -1:
+            self._zobrist_key ^= zobrist.EN_PASSANT_KEYS[en_passant_file]
+        en_passant_file = self._en_passant_file()
+        if en_passant_file != -1:
+            self._zobrist_key ^= zobrist.EN_PASSANT_KEYS[en_passant_file]
+        self._update_scores()
+
+        self._move_stack.append(UndoRecord(
+                move=move,
+                piece=piece,
+                is_first_move=is_first_move,
+                captured=captured,
+                captured_index=captured_index,
+                captured_slots=captured_slots,
+                en_passant=en_passant_start,
+                rook=rook,
+                rook_is_first_move=rook_is_first_move,
+                promoted=promoted,
+                pawn_slot=pawn_slot,
+                zobrist_key=zobrist_key,
+                halfmove_clock=halfmove_clock,
+                attacks=attacks,
+                attackers=attackers,
+        ))
+
+    def pop(self) -> BoardMove:
+        '''Reverts the most recent move applied with `push`, returning it'''
+        record = self._move_stack.pop()
+        move = record.move
+        piece = record.piece
+        start = move.start.index
+        end = move.end.index
+
+        if record.promoted is not None:
+            team = self._teams[piece.color]
+            team[team.index(record.promoted)] = piece
+            self._pieces[piece.color][record.promoted.piece_type].remove(record.promoted)
+            self._pieces[piece.color][piece.piece_type].insert(record.pawn_slot, piece)
+            self._take(end, False)
+            self._put(piece, end, False)
+
+        if record.rook is not None:
+            rook = record.rook
+            rook_pos_y = 7 if move.end.y > move.start.y else 0
+            self._put(self._take(rook.pos.index, False), square_index(rook.pos.x, rook_pos_y), False)
+            rook._pos = Point(rook.pos.x, rook_pos_y)
+            rook._is_first_move = record.rook_is_first_move
+
+        self._put(self._take(end, False), start, False)
+        piece._pos = move.start
+        piece._is_first_move = record.is_first_move
+
+        captured = record.captured
+        if captured is not None:
+            self._put(captured, record.captured_index, False)
+            team_slot, type_slot = record.captured_slots
+            self._teams[captured.color].insert(team_slot, captured)
+            self._pieces[captured.color][captured.piece_type].insert(type_slot, captured)
+
+        self._enpassant_location.update(record.en_passant)
+        self.turn = get_opposite_color(self.turn)
+        if self.turn == Color.Black:
+            self.fullmove_number -= 1
+        self._zobrist_key = record.zobrist_key
+        self.halfmove_clock = record.halfmove_clock
+        self._attacks = record.attacks
+        self._attackers = record.attackers
+        self._update_scores()
+
+        return move
+
+    def _update_scores(self) -> None:
+        '''Blends each color's middlegame & endgame sums by the game phase, O(1) whatever the position'''
+        phase = self._phase
+        self.white_score = piece_square.taper(self._middlegame_scores[Color.White],
+                                              self._endgame_scores[Color.White], phase)
+        self.black_score = piece_square.taper(self._middlegame_scores[Color.Black],
+                                              self._endgame_scores[Color.Black], phase)
+
+    def is_repetition(self) -> bool:
+        '''Whether the position occurred before, since the last capture or pawn move'''
+        key = self._zobrist_key
+        stack = self._move_stack
+
+        # The same side has to be to move, so only every other earlier position can match
+        first = max(len(stack) - self.halfmove_clock, 0)
+        for ply in range(len(stack) - 2, first - 1, -2):
+            if stack[ply].zobrist_key == key:
+                return True
+        return False
 
-        # An en passant was performed!
-        if piece.piece_type == PieceType.Pawn and to == en_passant_start:
-            self.remove_piece((starting_pos.x, to.y))
+    def _castling_rights(self) -> int:
+        '''Castling rights as zobrist right bits, derived from which kings and rooks have yet to move'''
+        rights = 0
+        for color, row, kingside, queenside in ((Color.White, 0, zobrist.WHITE_KINGSIDE, zobrist.WHITE_QUEENSIDE),
+                                                (Color.Black, 7, zobrist.BLACK_KINGSIDE, zobrist.BLACK_QUEENSIDE)):
+            king = self._squares[square_index(row, 4)]
+            if king is None or king.piece_type != PieceType.King or king.color != color or not king.is_first_move:
+                continue
+
+            for col, right in ((7, kingside), (0, queenside)):
+                rook = self._squares[square_index(row, col)]
+                if (rook is not None and rook.piece_type == PieceType.Rook and
+                        rook.color == color and rook.is_first_move):
+                    rights |= right
+        return rights
+
+    def _en_passant_file(self) -> int:
+        '''Column of the en passant square if the side to move has a pawn placed to capture onto it, otherwise -1'''
+        en_passant = self._enpassant_location.value
+        if not en_passant.is_valid():
+            return -1
+
+        row = en_passant.x - 1 if self.turn == Color.White else en_passant.x + 1
+        col = en_passant.y
+
+        capturers = EMPTY
+        if col > 0:
+            capturers |= BB_SQUARES[square_index(row, col - 1)]
+        if col < 7:
+            capturers |= BB_SQUARES[square_index(row, col + 1)]
+
+        if self._bitboards[self.turn][PieceType.Pawn] & capturers:
+            return col
+        return -1
+
+    def _compute_zobrist_key(self) -> int:
+        '''Hashes the position from scratch. Used to verify the incrementally maintained key'''
+        key = 0
+        for index, piece in enumerate(self._squares):
+            if piece is not None:
+                key ^= zobrist.PIECE_KEYS[piece.color][piece.piece_type][index]
 
+        if self.turn == Color.Black:
+            key ^= zobrist.SIDE_KEY
 
-        # Check for pawn promotion
-        if piece.piece_type == PieceType.Pawn:
-            color = piece.color
-            if ((color == Color.White and to.x == 7) or
-                (color == Color.Black and to.x == 0)):
+        key ^= zobrist.CASTLING_KEYS[self._castling_rights()]
 
-                if promotion is not None:
-                    new_piece = Piece.from_piece_type(promotion, color, self, to)
-                else:
-                    print('Congratulations! Pawn reached promotion row.')
-                    promote_type = input('Please enter desired promotion: ')
-
-                    if promote_type in ('Q', 'q', 'Qu', 'qu', 'Queen', 'queen'):
-                        new_piece = Queen(color, self, to)
-                    elif promote_type in ('R', 'r', 'Ro', 'ro', 'Rook', 'rook'):
-                        new_piece = Rook(color, self, to)
-                    elif promote_type in ('K', 'k', 'Kn', 'kn', 'Knigh', 'knight'):
-                        new_piece = Queen(color, self, to)
-                    elif promote_type in ('Q', 'q', 'Queen', 'queen'):
-                        new_piece = Queen(color, self, to)
-                    else:
-                        print(f"Unknown promotion '{promote_type}'. Defaulting to a new Queen.")
-                        new_piece = Queen(color, self, to)
-
-                self._board = self._board.assign.iloc[to.x, to.y](new_piece)
-
-                self._pieces[color][piece.piece_type].remove(piece)
-                self._pieces[color][new_piece.piece_type].add(new_piece)
-                del piece
+        en_passant_file = self._en_passant_file()
+        if en_passant_file != -1:
+            key ^= zobrist.EN_PASSANT_KEYS[en_passant_file]
 
-        self._update_check_state()
+        return key
 
     def invalidate_cache(self):
         for piece in self.get_team(Color.White):
@@ -323,19 +944,82 @@ class Board:
         for piece in self.get_team(Color.Black):
             piece.invalidate_cache()
 
-    def _update_check_state(self):
-        def update_team_check_state(color):
-            enemy_king = self.get_king(get_opposite_color(color))
-            in_check = False
-
-            for piece in self.get_team(color):
-                if piece.can_attack(enemy_king.pos):
-                    in_check = True
-                    break
-            enemy_king.in_check = in_check
-
-        update_team_check_state(Color.White)
-        update_team_check_state(Color.Black)
+        self._cache_baseline = None
+
+    def invalidate_cache_after_move(self):
+        '''
+        Invalidates the move caches of only the pieces whose moves the last pushed move could have changed.
+
+        Those are the pieces on or attacking a square the move emptied or filled (before or after it), pawns pushing
+        onto those squares, pawns next to the old or new en passant square, both kings, and every piece whose pin or
+        check restriction changed. Everything is invalidated if the caches weren't up to date right before the move.
+        '''
+        baseline = self._cache_baseline
+        if baseline is None or not self._move_stack or self._move_stack[-1].zobrist_key != baseline[0]:
+            self.invalidate_cache()
+            self._cache_baseline = (self._zobrist_key, {color: self.legality_masks(color) for color in Color})
+            return
+
+        record = self._move_stack[-1]
+        move = record.move
+        changed = (BB_SQUARES[move.start.index] | BB_SQUARES[move.end.index] |
+                   BB_SQUARES[record.captured_index])
+        if record.rook is not None:
+            rook = record.rook
+            changed |= BB_SQUARES[rook.pos.index] | BB_SQUARES[rook.pos.x * 8 + (7 if move.end.y > move.start.y else 0)]
+
+        white = self._bitboards[Color.White]
+        black = self._bitboards[Color.Black]
+        white_king = white[PieceType.King]
+        black_king = black[PieceType.King]
+
+        stale = changed | white_king | black_king
+        attackers = self._attackers
+        before = record.attackers
+        for square in iter_squares(changed):
+            stale |= before[square] | attackers[square]
+
+        white_pawns = white[PieceType.Pawn]
+        black_pawns = black[PieceType.Pawn]
+        stale |= (changed >> 8 | changed >> 16) & white_pawns | (changed << 8 | changed << 16) & black_pawns
+
+        for en_passant in (record.en_passant, self._enpassant_location.value):
+            if en_passant.is_valid():
+                index = en_passant.index
+                stale |= (PAWN_ATTACKS[Color.White][index] | PAWN_ATTACKS[Color.Black][index]) & (white_pawns | black_pawns)
+
+        white_occupancy = self._occupancy[Color.White]
+        black_occupancy = self._occupancy[Color.Black]
+        masks = baseline[1].copy()
+        for color, king_bb, own, enemy in ((Color.White, white_king, white_occupancy, black_occupancy),
+                                           (Color.Black, black_king, black_occupancy, white_occupancy)):
+            before_masks = masks[color]
+            king = lsb(king_bb)
+
+            if before_masks.checkers or attackers[king] & enemy:
+                # Getting into or out of check changes what every piece may do
+                masks[color] = self.legality_masks(color)
+                stale |= own
+            elif changed & (QUEEN_LINES[king] | king_bb):
+                # Pins only change when something moves on a line through the king
+                after_masks = masks[color] = self.legality_masks(color)
+                if after_masks.pins != before_masks.pins:
+                    for index in before_masks.pins.keys() | after_masks.pins.keys():
+                        if before_masks.pins.get(index) != after_masks.pins.get(index):
+                            stale |= BB_SQUARES[index]
+
+        occupied = white_occupancy | black_occupancy
+        stale &= occupied
+        squares = self._squares
+        invalidated = 0
+        for index in iter_squares(stale):
+            squares[index]._valid_moves_cache = None
+            invalidated += 1
+
+        stats = self.move_cache_stats
+        stats['invalidated'] += invalidated
+        stats['kept'] += popcount(occupied) - invalidated
+        self._cache_baseline = (self._zobrist_key, masks)
 
     def __repr__(self) -> str:
         s = BOARD_STR
@@ -359,7 +1043,7 @@ class Board:
             return s[:i] + val + s[i + 5:]
 
         for i, j in product(range(8), range(8)):
-            piece = self._board.iloc[i, j]
+            piece = self._squares[square_index(i, j)]
             if piece is not None:
                 s = update_s(i, j, str(piece))
 
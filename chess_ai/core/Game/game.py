@@ -1,10 +1,8 @@
 import typing as tp
 from enum import Enum
 from itertools import product
-from collections import namedtuple
-from tqdm import tqdm
+from collections import Counter
 
-from chess_ai.core.Game.screenshot import Screenshot
 from chess_ai.core.Game.board import Board
 from chess_ai.core.Mechanics.point import Point
 from chess_ai.core.Mechanics.color import Color, get_opposite_color
@@ -38,103 +36,220 @@ def competitive_ruleset_endings_text(ending: CompetitiveRulesetEndings) -> str:
         return "unknown reasons.\n"
 
 
-GameHistory = namedtuple('GameHistory', ('screenshot', 'count'))
-
-
 class UserQuitMidGameException(Exception):
     pass
 
 
+class GameResult(tp.NamedTuple):
+    '''How a game ended, or where it stopped'''
+    # Status of the side to move when the game ended or stopped
+    status: Status
+    # Set when the game ended by a competitive rule rather than by checkmate or stalemate
+    ending: tp.Optional[CompetitiveRulesetEndings]
+    # The side that delivered checkmate, if any
+    winner: tp.Optional[Color]
+    plies: int
+    # False when the game stopped before it ended, i.e. a player quit or the policy had no more moves
+    finished: bool
+
+
+class GamePolicy:
+    '''
+    Supplies the decisions a game needs from its players: moves, promotions and whether to claim optional draws.
+
+    The base policy is headless: it never prints or prompts, promotes to a queen, never claims a draw and has no
+    moves of its own, so a game stops once its initial moves are played. Subclass it to supply moves, e.g. from an
+    engine for self-play.
+    '''
+    # Whether the game should report its progress on stdout
+    interactive: bool = False
+
+    def choose_move(self, game: 'Game') -> tp.Optional[tp.Tuple[Point, Point]]:
+        '''The next move for the side to move as (from, to), or None to stop the game'''
+        return None
+
+    def choose_promotion(self, game: 'Game', piece: Pawn, to: Point) -> PieceType:
+        return PieceType.Queen
+
+    def claim_draw(self, game: 'Game', ending: CompetitiveRulesetEndings) -> bool:
+        '''Whether to claim an optional draw, by threefold repetition or the fifty move rule'''
+        return False
+
+
+class ConsolePolicy(GamePolicy):
+    '''Plays through stdin & stdout, the players type in their moves and answer promotion & draw prompts'''
+    interactive = True
+
+    _PROMOTIONS = dict(
+            q=PieceType.Queen, qu=PieceType.Queen, queen=PieceType.Queen,
+            r=PieceType.Rook, ro=PieceType.Rook, rook=PieceType.Rook,
+            b=PieceType.Bishop, bi=PieceType.Bishop, bishop=PieceType.Bishop,
+            n=PieceType.Knight, k=PieceType.Knight, kn=PieceType.Knight, knight=PieceType.Knight,
+    )
+
+    def choose_move(self, game: 'Game') -> tp.Optional[tp.Tuple[Point, Point]]:
+        print(game.board)
+        print(f"{game.current_team.value} team's turn.")
+
+        try:
+            return game.get_input('Please input your move: ')
+        except UserQuitMidGameException as e:
+            print(e)
+            return None
+
+    def choose_promotion(self, game: 'Game', piece: Pawn, to: Point) -> PieceType:
+        print('Congratulations! Pawn reached promotion row.')
+        promote_type = input('Please enter desired promotion: ')
+
+        promotion = self._PROMOTIONS.get(promote_type.lower())
+        if promotion is None:
+            print(f"Unknown promotion '{promote_type}'. Defaulting to a new Queen.")
+            promotion = PieceType.Queen
+        return promotion
+
+    def claim_draw(self, game: 'Game', ending: CompetitiveRulesetEndings) -> bool:
+        if ending == CompetitiveRulesetEndings.ThreefoldRepeat:
+            print('There have been three previous states exactly the smae as this one. Would anyone like to call a draw?')
+            response = input()
+        else:
+            response = input('There have been 50 moves without any pawns moved or any pieces captured. Would anyone like to draw? ')
+
+        if response in ('Y', 'y', 'Yes', 'yes'):
+            return True
+
+        if ending == CompetitiveRulesetEndings.ThreefoldRepeat:
+            print('Ok. Right to draw for three-fold state repetition has been forfeited. Will auto-draw at a five-fold repeition streak.')
+        else:
+            print('Ok. Right to draw for stagnant board state has been forfeited. Will auto-draw at a 75 no-progress streak.')
+        return False
+
+
 class Game:
     '''Responsible for managing the start, flow, and ending of a chess game'''
 
     INPUT_DELIMS = (' ', ',', ';', ':', '-')
     INVALID_INPUT_MSG = f'Invalid input. Please seperate two moves in standard chess format using one of these separators: {INPUT_DELIMS}'
 
-    def __init__(self):
+    def __init__(self, policy: tp.Optional[GamePolicy] = None):
         self.board: Board = Board()
         self.current_team: Color = Color.White
+        self.policy: GamePolicy = policy if policy is not None else ConsolePolicy()
+        self.plies: int = 0
 
-        self.game_history: tp.List[GameHistory] = [GameHistory(self.board.screenshot, 1)]
+        # Occurrences of each position (by zobrist key) since the last irreversible move
+        self.repetitions: tp.Counter[int] = Counter()
+        self._record_position()
 
         self.threefold_repetitions_forfeited: bool = False
         self.fifty_moves_no_progress_forfeited: bool = False
-        self.stagnant_move_count: int = 0
+
+    def _record_position(self):
+        # Positions from before a capture or pawn move can never recur, so stop tracking them
+        if self.board.halfmove_clock == 0:
+            self.repetitions.clear()
+        self.repetitions[self.board.zobrist_key] += 1
 
     def _reset_after_turn(self, status: Ref[Status]):
-        self.board.invalidate_cache()
+        self.board.invalidate_cache_after_move()
 
         # Change team
         self.current_team = get_opposite_color(self.current_team)
+        self.plies += 1
 
-        # Screenshot state
-        #self.game_history.append(GameHistory(self.board.screenshot, 1))
+        self._record_position()
 
         # Update status
         status.update(self.board.get_board_status(self.current_team))
 
     def _game_not_finished(self, status: Ref[Status], ending: Ref[tp.Optional[CompetitiveRulesetEndings]]) -> bool:
         status.update(self.board.get_board_status(self.current_team))
+        if status in (Status.Checkmate, Status.Stalemate):
+            # A move that ends the game stands even if it also reaches a repetition or no-progress limit
+            return False
+
         ending.update(self.check_competitive_ruleset())
 
-        if status in (Status.Checkmate, Status.Stalemate) or ending.value is not None:
+        if ending.value is not None:
             return False
         return True
 
     def start_game(self, initial_moves: tp.Union[None, Parser, tp.List[tp.Tuple[str, str]]] = None):
-        game_status: Status = Ref(Status.InProgress)
+        '''Plays the game out, returning its final status & competitive ending (if any). See `play`'''
+        result = self.play(initial_moves)
+        return Ref(result.status), Ref(result.ending)
+
+    def play(self, initial_moves: tp.Union[None, Parser, tp.List[tp.Tuple[str, str]]] = None) -> GameResult:
+        '''
+        Plays any initial moves, then asks the policy for moves until the game ends or the policy stops it.
+
+        Initial moves are either a parsed PGN, or (from, to) square pairs.
+        '''
+        game_status: Ref[Status] = Ref(Status.InProgress)
         competitive_ending: Ref[tp.Optional[CompetitiveRulesetEndings]] = Ref(None)
 
         if initial_moves is not None:
             if isinstance(initial_moves, Parser):
-                for white_move, black_move in tqdm(initial_moves.yield_moves(), total=8849):
+                for white_move, black_move in initial_moves.yield_moves():
                     piece, w_destination, w_promotion = self.board.parse_points_from_move(white_move)
-                    self.board.perform_move(piece, w_destination, promotion=w_promotion)
+                    self.perform_move(piece, w_destination, w_promotion)
 
                     self._reset_after_turn(game_status)
 
                     if black_move is None:
                         break
                     piece, b_destination, b_promotion = self.board.parse_points_from_move(black_move)
-                    self.board.perform_move(piece, b_destination, promotion=b_promotion)
+                    self.perform_move(piece, b_destination, b_promotion)
                     self._reset_after_turn(game_status)
 
             else:
-                for move1, move2 in tqdm(initial_moves):
+                for move1, move2 in initial_moves:
                     destination = Point.from_str(move2)
-                    self.board.perform_move(self.board[move1], destination, promotion=PieceType.Queen)
+                    self.perform_move(self.board[move1], destination, PieceType.Queen)
 
                     self._reset_after_turn(game_status)
 
+        finished = True
         while self._game_not_finished(game_status, competitive_ending):
-            print(self.board)
-            #print(f'White Score: {self.get_score(Color.White)}')
-            #print(f'Black Score: {self.get_score(Color.Black)}')
-
-            print(f"{self.current_team.value} team's turn.")
-
-            try:
-                piece_location, move_to = self.get_input('Please input your move: ')
-            except UserQuitMidGameException as e:
-                print(e)
-                return game_status, competitive_ending
-
+            move = self.policy.choose_move(self)
+            if move is None:
+                finished = False
+                break
 
+            piece_location, move_to = move
             piece = self.board[piece_location]
 
             # Cache values before move
             white_check = self.board.get_king(Color.White).in_check
             black_check = self.board.get_king(Color.Black).in_check
 
-            self.board.perform_move(piece, move_to)
+            self.perform_move(piece, move_to)
 
-            self.output_check_status_updates(white_check, black_check)
+            if self.policy.interactive:
+                self.output_check_status_updates(white_check, black_check)
 
             self._reset_after_turn(game_status)
 
-        self.display_game_ending(game_status, competitive_ending)
+        if finished and self.policy.interactive:
+            self.display_game_ending(game_status, competitive_ending)
+
+        winner = None
+        if game_status.value == Status.Checkmate:
+            winner = get_opposite_color(self.current_team)
+
+        return GameResult(
+                status=game_status.value,
+                ending=competitive_ending.value,
+                winner=winner,
+                plies=self.plies,
+                finished=finished,
+        )
 
-        return game_status, competitive_ending
+    def perform_move(self, piece: Piece, to: Point, promotion: tp.Optional[PieceType] = None):
+        '''Moves a piece, asking the policy what to promote to when a pawn reaches the last row without one'''
+        if promotion is None and piece.piece_type == PieceType.Pawn and to.x in (0, 7):
+            promotion = self.policy.choose_promotion(self, piece, to)
+
+        self.board.perform_move(piece, to, promotion=promotion)
 
     def get_input(self, msg: str) -> Point:
         '''Prompts for input from the user. Parses input'''
@@ -220,7 +335,7 @@ class Game:
         if game_status == Status.Checkmate:
             print(f'{get_opposite_color(self.current_team).value} just checkmated {self.current_team.value}!')
 
-        elif game_status == Status.Checkmate:
+        elif game_status == Status.Stalemate:
             print('Stalemate!')
 
         else:
@@ -228,74 +343,36 @@ class Game:
 
     def check_repetitions(self) -> tp.Optional[CompetitiveRulesetEndings]:
         '''Checks to see if repeat games occured'''
-        found_match = False
-        first = True
+        count = self.repetitions[self.board.zobrist_key]
 
-        # Start from the top as the most likely occurrence of a threefold/fivefold repetition will be the most recent games
-        for game_history in reversed(self.game_history):
-            if first:
-                first = False
-                continue
+        if count >= 5:
+            # Fivefold repeat draw is mandatory
+            return CompetitiveRulesetEndings.FivefoldRepeat
+        elif count >= 3 and not self.threefold_repetitions_forfeited:
+            if self.policy.claim_draw(self, CompetitiveRulesetEndings.ThreefoldRepeat):
+                return CompetitiveRulesetEndings.ThreefoldRepeat
 
-            last_game = self.game_history[-1]
-
-            if last_game.screenshot.compare_available_moves(game_history.screenshot):
-                # Found a match. Propogate up from that state the number of matches it found and aggregate into the most recent find
-                self.game_history[-1] = GameHistory(last_game.screenshot, last_game.count + 1)
-                found_match = True
-
-            if last_game.count == 5:
-                # Fivefold repeat draw is mandatory
-                return CompetitiveRulesetEndings.FivefoldRepeat
-            elif last_game.count >= 3 and not self.threefold_repetitions_forfeited:
-                print('There have been three previous states exactly the smae as this one. Would anyone like to call a draw?')
-                response = input()
-                if response in ('Y', 'y', 'Yes', 'yes'):
-                    return CompetitiveRulesetEndings.ThreefoldRepeat
-                else:
-                    print('Ok. Right to draw for three-fold state repetition has been forfeited. Will auto-draw at a five-fold repeition streak.')
-
-                    #  Players have forfeited the right to end at three-fold repetitions
-                    self.threefold_repetitions_forfeited = True
-                    return None
-            elif found_match:
-                # We documented the match, but it didn't warrant a competitive ending.
-                break
+            #  Players have forfeited the right to end at three-fold repetitions
+            self.threefold_repetitions_forfeited = True
 
         return None
 
     def check_no_progress(self) -> tp.Optional[CompetitiveRulesetEndings]:
         '''Checks to see if no progress streaks have occured'''
-        if len(self.game_history) == 1:
-            self.stagnant_move_count = 1
-            return
-
-        screenshot1: Screenshot = self.game_history[-1].screenshot
-        screenshot2: Screenshot = self.game_history[-2].screenshot
-
-        # Check to see if any pawns moved or if any pieces were captured
-        if not screenshot1.compare_piece_count(screenshot2) or not screenshot1.compare_pawn_locations(screenshot2):
-            # Reset since a significant change happened
-            self.stagnant_move_count = 0
-            return None
-
-        self.stagnant_move_count += 1
+        # The board counts plies since the last pawn move or capture, the rules count moves by both players
+        stagnant_move_count = self.board.halfmove_clock // 2
 
-        if self.stagnant_move_count >= 75:
+        if stagnant_move_count >= 75:
             # Seventy-five moves with no progress draw is mandatory
             return CompetitiveRulesetEndings.SeventyFiveNoProgress
 
-        if self.stagnant_move_count >= 50 and not self.fifty_moves_no_progress_forfeited:
-            response = input('There have been 50 moves without any pawns moved or any pieces captured. Would anyone like to draw? ')
-
-            if respone in ('Y', 'y', 'Yes', 'yes'):
+        if stagnant_move_count >= 50 and not self.fifty_moves_no_progress_forfeited:
+            if self.policy.claim_draw(self, CompetitiveRulesetEndings.FiftyNoProgress):
                 return CompetitiveRulesetEndings.FiftyNoProgress
-            else:
-                print('Ok. Right to draw for stagnant board state has been forfeited. Will auto-draw at a 75 no-progress streak.')
 
-                # Players have forfeited the right to end at fifty-fold repetitions
-                self.fifty_moves_no_progress_forfeited = True
-                return None
+            # Players have forfeited the right to end at fifty-fold repetitions
+            self.fifty_moves_no_progress_forfeited = True
+            return None
 
         return None
 
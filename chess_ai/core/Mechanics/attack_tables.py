@@ -0,0 +1,118 @@
+'''
+Attack and geometry lookup tables, built once when the module is imported.
+
+Every table is indexed by square index (see bitboard.square_index) and holds bitboards.
+'''
+import typing as tp
+
+from chess_ai.core.Mechanics.bitboard import (BB_SQUARES, EMPTY, lsb,
+        ORTHOGONAL_DIRECTIONS, DIAGONAL_DIRECTIONS, KNIGHT_OFFSETS, KING_OFFSETS)
+from chess_ai.core.Mechanics.color import Color
+
+
+DIRECTIONS = ORTHOGONAL_DIRECTIONS + DIAGONAL_DIRECTIONS
+
+
+def _on_board(row: int, col: int) -> bool:
+    return 0 <= row <= 7 and 0 <= col <= 7
+
+
+def _gen_step_table(offsets) -> tp.Tuple[int, ...]:
+    table = []
+    for index in range(64):
+        row, col = divmod(index, 8)
+        attacks = EMPTY
+        for d_row, d_col in offsets:
+            if _on_board(row + d_row, col + d_col):
+                attacks |= BB_SQUARES[(row + d_row) * 8 + col + d_col]
+        table.append(attacks)
+    return tuple(table)
+
+
+def _gen_ray_table(d_row: int, d_col: int) -> tp.Tuple[int, ...]:
+    '''Squares from each square to the edge of the board in one direction, excluding the square itself'''
+    table = []
+    for index in range(64):
+        row, col = divmod(index, 8)
+        ray = EMPTY
+        row += d_row
+        col += d_col
+        while _on_board(row, col):
+            ray |= BB_SQUARES[row * 8 + col]
+            row += d_row
+            col += d_col
+        table.append(ray)
+    return tuple(table)
+
+
+KNIGHT_ATTACKS = _gen_step_table(KNIGHT_OFFSETS)
+KING_ATTACKS = _gen_step_table(KING_OFFSETS)
+
+# Squares a pawn of each color attacks from each square
+PAWN_ATTACKS: tp.Dict[Color, tp.Tuple[int, ...]] = {
+        Color.White: _gen_step_table(((1, 1), (1, -1))),
+        Color.Black: _gen_step_table(((-1, 1), (-1, -1))),
+}
+
+# One ray table per direction. A direction is "positive" when it walks towards higher square indices,
+# in which case the nearest blocker on a ray is its lowest set bit, otherwise its highest.
+RAYS: tp.Dict[tp.Tuple[int, int], tp.Tuple[int, ...]] = {direction: _gen_ray_table(*direction) for direction in DIRECTIONS}
+POSITIVE_DIRECTIONS = tuple(d for d in DIRECTIONS if d[0] * 8 + d[1] > 0)
+NEGATIVE_DIRECTIONS = tuple(d for d in DIRECTIONS if d[0] * 8 + d[1] < 0)
+
+_ORTHOGONAL_RAYS = tuple((RAYS[d], d in POSITIVE_DIRECTIONS) for d in ORTHOGONAL_DIRECTIONS)
+_DIAGONAL_RAYS = tuple((RAYS[d], d in POSITIVE_DIRECTIONS) for d in DIAGONAL_DIRECTIONS)
+
+
+def _gen_line_tables() -> tp.Tuple[tp.Tuple[tp.Tuple[int, ...], ...], ...]:
+    between = [[EMPTY] * 64 for _ in range(64)]
+    line = [[EMPTY] * 64 for _ in range(64)]
+    beyond = [[EMPTY] * 64 for _ in range(64)]
+
+    for a in range(64):
+        for d_row, d_col in DIRECTIONS:
+            forward = RAYS[(d_row, d_col)][a]
+            full_line = forward | RAYS[(-d_row, -d_col)][a] | BB_SQUARES[a]
+            for b in range(64):
+                if forward & BB_SQUARES[b]:
+                    between[a][b] = forward & ~RAYS[(d_row, d_col)][b] & ~BB_SQUARES[b]
+                    line[a][b] = full_line
+                    beyond[a][b] = RAYS[(d_row, d_col)][b]
+
+    return tuple(tuple(tuple(row) for row in table) for table in (between, line, beyond))
+
+
+# BETWEEN[a][b]: squares strictly between two squares sharing a rank, file or diagonal (otherwise empty)
+# LINE[a][b]: the entire rank, file or diagonal through two aligned squares, edge to edge (otherwise empty)
+# BEYOND[a][b]: squares past b on the ray from a through b, up to the edge (otherwise empty)
+BETWEEN, LINE, BEYOND = _gen_line_tables()
+
+
+def _slide(index: int, occupied: int, rays) -> int:
+    attacks = EMPTY
+    for table, positive in rays:
+        ray = table[index]
+        blockers = ray & occupied
+        if blockers:
+            first = lsb(blockers) if positive else blockers.bit_length() - 1
+            ray ^= table[first]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(index: int, occupied: int) -> int:
+    '''Squares a rook on `index` attacks, up to and including the first blocker in each direction'''
+    return _slide(index, occupied, _ORTHOGONAL_RAYS)
+
+
+def bishop_attacks(index: int, occupied: int) -> int:
+    '''Squares a bishop on `index` attacks, up to and including the first blocker in each direction'''
+    return _slide(index, occupied, _DIAGONAL_RAYS)
+
+
+def queen_attacks(index: int, occupied: int) -> int:
+    return _slide(index, occupied, _ORTHOGONAL_RAYS) | _slide(index, occupied, _DIAGONAL_RAYS)
+
+
+# Every square sharing a rank, file or diagonal with each square, i.e. a queen's attacks on an empty board
+QUEEN_LINES = tuple(queen_attacks(index, EMPTY) for index in range(64))
@@ -0,0 +1,49 @@
+import typing as tp
+
+
+# Squares are indexed row-major from A1: index = row * 8 + col (A1 = 0, H1 = 7, A8 = 56, H8 = 63)
+EMPTY = 0
+FULL = (1 << 64) - 1
+
+BB_SQUARES: tp.Tuple[int, ...] = tuple(1 << i for i in range(64))
+
+
+# Every square of each file (column) and rank (row)
+FILES: tp.Tuple[int, ...] = tuple(0x0101010101010101 << col for col in range(8))
+RANKS: tp.Tuple[int, ...] = tuple(0xFF << (8 * row) for row in range(8))
+
+
+def square_index(row: int, col: int) -> int:
+    return row * 8 + col
+
+
+def square_row(index: int) -> int:
+    return index >> 3
+
+
+def square_col(index: int) -> int:
+    return index & 7
+
+
+def popcount(bb: int) -> int:
+    return bin(bb).count('1')
+
+
+def lsb(bb: int) -> int:
+    '''Index of the least significant set bit. bb must be non-zero'''
+    return (bb & -bb).bit_length() - 1
+
+
+def iter_squares(bb: int) -> tp.Iterator[int]:
+    '''Yields the index of every set bit, lowest first'''
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+# (row, col) steps for each kind of movement
+ORTHOGONAL_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+DIAGONAL_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+KNIGHT_OFFSETS = ((1, 2), (1, -2), (-1, 2), (-1, -2), (2, 1), (2, -1), (-2, 1), (-2, -1))
+KING_OFFSETS = ORTHOGONAL_DIRECTIONS + DIAGONAL_DIRECTIONS
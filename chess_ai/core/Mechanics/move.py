@@ -6,12 +6,42 @@ from chess_ai.core.Mechanics.color import Color
 from chess_ai.core.Pieces.piece import PieceType
 
 
+class UnresolvedMove(Exception):
+    '''A move that doesn't name exactly one legal move in the position it's played in'''
+    pass
+
+
+class IllegalMove(UnresolvedMove):
+    pass
+
+
+class AmbiguousMove(UnresolvedMove):
+    pass
+
+
 class Castle(Enum):
     Kingside = 'Kingside'
     Queenside = 'Queeenside'
 
 
+class SanMove(tp.NamedTuple):
+    '''A parsed SAN move: just what it takes to find the move on a board'''
+    move: str
+    color: Color
+    piece: PieceType
+    col_helper: tp.Optional[str]
+    row_helper: tp.Optional[int]
+    destination: tp.Optional[Point]
+    en_passant: bool
+    upgrade: tp.Optional[PieceType]
+    castle: tp.Optional[Castle]
+
+    def __repr__(self):
+        return f'{self.move} ({self.color.value})'
+
+
 class Move(tp.NamedTuple):
+    '''A parsed SAN move, along with a description of it for display'''
     move: str
     color: Color
     piece: PieceType
@@ -43,3 +73,14 @@ class Move(tp.NamedTuple):
             upgrade = f'. Upgrades to {self.upgrade.value}'
 
         return f'{move}{color} {self.piece.value}{loc_helper}{self.action}{self.destination.to_str()}{upgrade}'
+
+
+class BoardMove(tp.NamedTuple):
+    '''A move expressed as board coordinates, as consumed by Board.push'''
+    start: Point
+    end: Point
+    promotion: tp.Optional[PieceType] = None
+
+    def __repr__(self):
+        promotion = f'={self.promotion.value}' if self.promotion is not None else ''
+        return f'{self.start.to_str()}{self.end.to_str()}{promotion}'
@@ -1,8 +1,22 @@
+import typing as tp
+
 
 def check_bounds(x):
     return 0 <= x <= 7
 
 class Point:
+    '''
+    A square on the board. Points are interned: there is exactly one instance per square plus two sentinels,
+    `NONE` for "no square" (the default, `Point()`) and `OFF_BOARD` for any coordinates outside the board.
+
+    Being interned, points are immutable and compare & hash by identity.
+    '''
+    __slots__ = ('x', 'y', 'index')
+
+    x: int
+    y: int
+    index: int
+
     KEY_MAP = dict(
             a=0, b=1, c=2, d=3, e=4, f=5, g=6, h=7,
             A=0, B=1, C=2, D=3, E=4, F=5, G=6, H=7)
@@ -11,52 +25,62 @@ class Point:
             0: 'A', 1: 'B', 2: 'C', 3: 'D', 4: 'E', 5: 'F', 6: 'G', 7: 'H',
     }
 
+    # Filled in below, once the instances exist
+    _STR_TABLE: tp.Dict[str, 'Point'] = {}
+
     @classmethod
     def from_str(cls, coordinates: str) -> 'Point':
+        point = cls._STR_TABLE.get(coordinates)
+        if point is not None:
+            return point
+
         try:
             y = cls.KEY_MAP.get(coordinates[0], -1)
             return cls(int(coordinates[1]) - 1, y)
-        except:
-            breakpoint()
-            stop_here = True
-            return Point()
-
-    def __init__(self, x=-1, y=-1):
-        self._x = x
-        self._y = y
-
-    def is_valid(self):
-        return check_bounds(self._x) and check_bounds(self._y)
+        except (IndexError, ValueError):
+            return NONE
 
-    def __eq__(self, other):
-        return self._x == other.x and self._y == other.y
+    def __new__(cls, x: int = -1, y: int = -1) -> 'Point':
+        if 0 <= x <= 7 and 0 <= y <= 7:
+            return SQUARES[x * 8 + y]
+        if x == -1 and y == -1:
+            return NONE
+        return OFF_BOARD
 
-    def __hash__(self):
-        return hash(hash(self.x) + hash(self.y))
-
-    def equals(self, x, y):
-        return self._x == x and self._y == y
+    @classmethod
+    def _intern(cls, x: int, y: int, index: int) -> 'Point':
+        point = object.__new__(cls)
+        object.__setattr__(point, 'x', x)
+        object.__setattr__(point, 'y', y)
+        object.__setattr__(point, 'index', index)
+        return point
 
-    @property
-    def x(self):
-        return self._x
+    def __setattr__(self, name, value):
+        raise AttributeError('Points are interned and immutable')
 
-    @x.setter
-    def x(self, val):
-        assert check_bounds(val)
-        self._x = x
+    def __reduce__(self):
+        # Unpickle (e.g. in another process) back onto that process's interned instance
+        return Point, (self.x, self.y)
 
-    @property
-    def y(self):
-        return self._y
+    def is_valid(self):
+        return self.index >= 0
 
-    @y.setter
-    def y(self, val):
-        assert check_bounds(val)
-        self._y = y
+    def equals(self, x, y):
+        return self.x == x and self.y == y
 
     def to_str(self) -> str:
         return f'{self.REVERSE_KEY_MAP[self.y]}{self.x + 1}'
 
     def __repr__(self):
         return f'Point<{self.x}, {self.y}>'
+
+
+# One instance per square, by square index (row * 8 + col)
+SQUARES: tp.Tuple[Point, ...] = tuple(Point._intern(index >> 3, index & 7, index) for index in range(64))
+
+# Sentinels. Neither is a square, so both have an index of -1
+NONE: Point = Point._intern(-1, -1, -1)
+OFF_BOARD: Point = Point._intern(8, 8, -1)
+
+Point._STR_TABLE = {f'{col}{point.x + 1}': point
+                    for point in SQUARES for col in (Point.REVERSE_KEY_MAP[point.y], Point.REVERSE_KEY_MAP[point.y].lower())}
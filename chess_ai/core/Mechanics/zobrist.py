@@ -0,0 +1,51 @@
+import random
+import typing as tp
+
+from chess_ai.core.Mechanics.color import Color
+from chess_ai.core.Pieces.piece import PieceType
+
+
+# Fixed seed so keys are stable across processes and runs
+_SEED = 0x5EED_C4E5
+
+
+# Castling right bits, as returned by Board._castling_rights
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+
+
+def _gen_keys():
+    rng = random.Random(_SEED)
+
+    def key() -> int:
+        return rng.getrandbits(64)
+
+    piece_keys = {
+            color: {piece_type: tuple(key() for _ in range(64)) for piece_type in PieceType}
+            for color in Color
+    }
+
+    side_key = key()
+
+    right_keys = [key() for _ in range(4)]
+    castling_keys = []
+    for rights in range(16):
+        combined = 0
+        for bit, right_key in enumerate(right_keys):
+            if rights & (1 << bit):
+                combined ^= right_key
+        castling_keys.append(combined)
+
+    en_passant_keys = tuple(key() for _ in range(8))
+
+    return piece_keys, side_key, tuple(castling_keys), en_passant_keys
+
+
+PIECE_KEYS: tp.Dict[Color, tp.Dict[PieceType, tp.Tuple[int, ...]]]
+SIDE_KEY: int
+CASTLING_KEYS: tp.Tuple[int, ...]
+EN_PASSANT_KEYS: tp.Tuple[int, ...]
+
+PIECE_KEYS, SIDE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS = _gen_keys()
@@ -1,11 +1,13 @@
 from abc import abstractclassmethod
 import typing as tp
-from itertools import product
 from enum import Enum
 
 from chess_ai.core.Utils.reference import Ref
 from chess_ai.core.Mechanics.color import Color, get_opposite_color
-from chess_ai.core.Mechanics.point import Point, check_bounds
+from chess_ai.core.Mechanics.point import Point, SQUARES, NONE, check_bounds
+from chess_ai.core.Mechanics.bitboard import BB_SQUARES, EMPTY, square_index, iter_squares
+from chess_ai.core.Mechanics.attack_tables import (KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, BEYOND,
+        rook_attacks, bishop_attacks, queen_attacks)
 
 from termcolor import colored
 
@@ -23,10 +25,14 @@ class PieceType(Enum):
 
 
 class Piece:
+    # Pieces carry no __dict__, subclasses must declare (empty) __slots__ too to keep it that way
+    __slots__ = ('color', '_board', '_pos', '_is_first_move', '_valid_moves_cache')
+
     color: Color
     _board: 'Board'
     _pos: Point
     _is_first_move: bool
+    _valid_moves_cache: tp.Optional[tp.List[Point]]
 
     @classmethod
     def from_piece_type(cls, piece_type: PieceType, color: Color, board: 'Board', pos: Point):
@@ -59,19 +65,6 @@ class Piece:
     def can_attack(self, pos: Point, *, ignore_color: bool = False) -> bool:
         raise NotImplementedError()
 
-    def try_attack_from(self, try_from: Point, attack_to: Point) -> bool:
-        '''
-        Attemps to see if a piece can attack antoher piece given an arbitrary staring location
-        '''
-        original_pos = self._pos
-        self._pos = try_from # Pretend to be in a different location
-
-        can_attack = self.can_attack(attack_to)
-
-        self._pos = original_pos # Restore original state
-
-        return can_attack
-
     def is_valid_move(self, pos: Point) -> bool:
         if not self.can_attack(pos):
             return False
@@ -87,18 +80,32 @@ class Piece:
             self._is_first_move = False
         self._pos = to
 
-        en_passant.update(Point())
+        en_passant.update(NONE)
 
     def invalidate_cache(self) -> None:
         self._valid_moves_cache = None
 
-    @abstractclassmethod
-    def _get_all_valid_moves(self) -> tp.List[Point]:
+    def _pseudo_legal_targets(self, index: int) -> int:
+        '''Bitboard of squares the piece could move to ignoring the safety of its king'''
         raise NotImplementedError()
 
+    def _get_all_valid_moves(self) -> tp.List[Point]:
+        index = self._pos.index
+        masks = self._board.legality_masks(self.color)
+
+        targets = self._pseudo_legal_targets(index) & masks.check_mask
+        pin = masks.pins.get(index)
+        if pin is not None:
+            targets &= pin
+
+        return [SQUARES[target] for target in iter_squares(targets)]
+
     def get_all_valid_moves(self) -> tp.List[Point]:
         if self._valid_moves_cache is None:
+            self._board.move_cache_stats['misses'] += 1
             self._valid_moves_cache = self._get_all_valid_moves()
+        else:
+            self._board.move_cache_stats['hits'] += 1
 
         return self._valid_moves_cache
 
@@ -111,61 +118,21 @@ class Piece:
         return self._pos
 
     def _can_move_horizontally_to(self, to: int) -> bool:
-        if self._check_illegal_move(Point(self._pos.x, to)):
-            return False
-
-        me_x = self._pos.x
-        me_y = self._pos.y
-        direction = 1 if to > me_y else -1 # 1 = right, -1 = left
-        col = me_y + direction # Move one space away as starting square
-
-        # Keep advancing along empty spaces until end is hit
-        while col != to:
-            if self._board[me_x, col] is not None:
-                return False
-            col += direction
-
-        return True
+        return self._can_slide_to(Point(self._pos.x, to))
 
     def _can_move_vertically_to(self, to: int) -> bool:
-        if self._check_illegal_move(Point(to, self._pos.y)):
-            return False
-
-        me_x = self._pos.x
-        me_y = self._pos.y
-        direction = 1 if to > me_x else -1 # 1 = down, -1 = up
-        row = me_x + direction # Move one space away as starting square
-
-        # Keep advancing along empty spaces until end is hit
-        while row != to:
-            if self._board[row, me_y] is not None:
-                return False
-            row += direction
-
-        return True
+        return self._can_slide_to(Point(to, self._pos.y))
 
     def _can_move_diagonally_to(self, to: Point) -> bool:
+        return self._can_slide_to(to)
+
+    def _can_slide_to(self, to: Point) -> bool:
         if self._check_illegal_move(to):
             return False
 
-        me_x = self._pos.x
-        me_y = self._pos.y
-
-        x_direction = 1 if to.x > me_x else -1
-        y_direction = 1 if to.y > me_y else -1
-
-        # Move one space away as starting square
-        row = me_x + x_direction
-        col = me_y + y_direction
-
-        # Keep advancing along empty spaces until end is hit
-        while not to.equals(row, col):
-            if self._board[row, col] is not None:
-                return False
-            row += x_direction
-            col += y_direction
-
-        return True
+        # Every square strictly between the two has to be empty
+        between = BETWEEN[self._pos.index][to.index]
+        return not between & self._board.occupied
 
     def _check_illegal_move(self, to: Point, *, ignore_color: bool = False) -> bool:
         # Cannot move outisde board or to same spot
@@ -176,17 +143,15 @@ class Piece:
             return False
 
         # Cannot move to teammate spot
-        actual_piece = self._board[to]
-        if actual_piece is not None and actual_piece.color == self.color:
-            return True
-
-        return False
+        return bool(self._board.occupancy(self.color) & BB_SQUARES[to.index])
 
     def __repr__(self) -> str:
         return self.color.value[0].lower() + self.__class__.__name__[:2]
 
 
 class Queen(Piece):
+    __slots__ = ()
+
     @property
     def piece_type(cls) -> PieceType:
         return PieceType.Queen
@@ -213,30 +178,23 @@ class Queen(Piece):
 
         return False
 
-    def _get_all_valid_moves(self) -> tp.List[Point]:
-        moves = []
-        for row, col in product(range(8), range(8)):
-            move = Point(row, col)
-            if self.is_valid_move(move):
-                moves.append(move)
-        return moves
+    def _pseudo_legal_targets(self, index: int) -> int:
+        return queen_attacks(index, self._board.occupied) & ~self._board.occupancy(self.color)
 
 
 class King(Piece):
+    __slots__ = ()
+
     @property
     def piece_type(cls) -> PieceType:
         return PieceType.King
 
-    def __init__(self, color: Color, board: 'Board', pos: Point):
-        super().__init__(color, board, pos)
-        self.in_check = False
+    @property
+    def in_check(self) -> bool:
+        return self._board.is_attacked(self._pos.index, get_opposite_color(self.color))
 
     def is_valid_move(self, pos: Point) -> bool:
-        if not self.can_attack(pos):
-            return False
-
-        # Cannot move into check
-        return not self._board.is_attackable(pos, get_opposite_color(self.color))
+        return pos in self.get_all_valid_moves()
 
     def can_attack(self, pos: Point, *, ignore_color: bool = False) -> bool:
         if self._check_illegal_move(pos, ignore_color=ignore_color):
@@ -250,9 +208,7 @@ class King(Piece):
         h_distance = abs(me_y - to_y)
 
         # Check if standard move
-        if ((v_distance == 0 and h_distance == 1) or
-                (v_distance == 1 and h_distance == 0) or
-                (v_distance == 1 and h_distance == 1)):
+        if KING_ATTACKS[square_index(me_x, me_y)] & BB_SQUARES[square_index(to_x, to_y)]:
             return True
 
         # Castling is illegal if the king has already moved
@@ -282,33 +238,38 @@ class King(Piece):
         return False
 
     def _get_all_valid_moves(self) -> tp.List[Point]:
-        moves = []
-
-        x = self.pos.x
-        y = self.pos.y
-
-        for row, col in product(range(-1, 2), range(-1, 2)):
-            move = Point(x + row, y + col)
-            if self.is_valid_move(move):
-                moves.append(move)
-
-        # Check potential castle moves
-        if self._is_first_move:
-            row = 0 if self.color == Color.White else 7
-
-            move_left = Point(row, 3)
-            move_right = Point(row, 6)
-
-            if self.is_valid_move(move_left):
-                moves.append(move_left)
-
-            if self.is_valid_move(move_right):
-                moves.append(move_right)
+        board = self._board
+        index = self._pos.index
+        enemy = get_opposite_color(self.color)
+
+        targets = KING_ATTACKS[index] & ~board.occupancy(self.color)
+
+        # The king can't hide behind itself from a slider checking it, so the square past it on the line is off
+        # limits too
+        for checker in iter_squares(board.attackers_of(index, enemy)):
+            if board[checker >> 3, checker & 7].piece_type in (PieceType.Queen, PieceType.Rook, PieceType.Bishop):
+                targets &= ~BEYOND[checker][index]
+
+        moves = [SQUARES[target] for target in iter_squares(targets) if not board.is_attacked(target, enemy)]
+
+        # Castling: neither piece has moved, the path is empty and the king doesn't start in, pass through or
+        # land in check
+        row = 0 if self.color == Color.White else 7
+        if self._is_first_move and index == square_index(row, 4) and not board.is_attacked(index, enemy):
+            for rook_col, empty_cols, safe_cols, to_col in ((7, (5, 6), (5, 6), 6), (0, (1, 2, 3), (3, 2), 2)):
+                rook = board[row, rook_col]
+                if (rook is not None and rook.piece_type == PieceType.Rook and rook.color == self.color and
+                        rook.is_first_move and
+                        all(board[row, col] is None for col in empty_cols) and
+                        not any(board.is_attacked(square_index(row, col), enemy) for col in safe_cols)):
+                    moves.append(Point(row, to_col))
 
         return moves
 
 
 class Pawn(Piece):
+    __slots__ = ()
+
     @property
     def piece_type(cls) -> PieceType:
         return PieceType.Pawn
@@ -357,7 +318,7 @@ class Pawn(Piece):
         to_y = to.y
 
         # If double-step, any existing en passant was effectively ignored and a new en passant is in effect
-        new_en_passant = Point()
+        new_en_passant = NONE
         if abs(piece_x - to_x) == 2:
             direction = -1 if piece_x > to_x else 1
 
@@ -366,24 +327,49 @@ class Pawn(Piece):
         super().perform_move(to, en_passant)
         en_passant.update(new_en_passant)
 
-    def _get_all_valid_moves(self) -> tp.List[Point]:
-        moves = []
-        x = self.pos.x
-        y = self.pos.y
+    def _pseudo_legal_targets(self, index: int) -> int:
+        board = self._board
+        occupied = board.occupied
+        row = index >> 3
+        col = index & 7
         direction = 1 if self.color == Color.White else -1
 
-        possible_moves = [Point(x + direction, y),
-                          Point(x + 2 * direction, y),
-                          Point(x + direction, y - 1),
-                          Point(x + direction, y + 1)]
+        targets = EMPTY
+        row += direction
+        if not check_bounds(row):
+            return targets
+
+        # Forward one, then forward two on the first move, both onto empty squares
+        single = BB_SQUARES[row * 8 + col]
+        if not occupied & single:
+            targets |= single
+            row += direction
+            if self._is_first_move and check_bounds(row) and not occupied & BB_SQUARES[row * 8 + col]:
+                targets |= BB_SQUARES[row * 8 + col]
+
+        # Diagonal captures of enemy pieces
+        targets |= PAWN_ATTACKS[self.color][index] & board.occupancy(get_opposite_color(self.color))
+        return targets
+
+    def _get_all_valid_moves(self) -> tp.List[Point]:
+        moves = super()._get_all_valid_moves()
+
+        # En passant captures remove a pawn off of the destination square, so they can uncover checks the
+        # pin and check masks don't account for. They're rare enough to verify by playing them out.
+        en_passant = self._board.en_passant
+        if (en_passant.is_valid() and
+                en_passant.x == (5 if self.color == Color.White else 2) and
+                en_passant.x - self._pos.x == (1 if self.color == Color.White else -1) and
+                abs(en_passant.y - self._pos.y) == 1 and
+                not self._board.move_exposes_king(self, en_passant, self.color)):
+            moves.append(en_passant)
 
-        for move in possible_moves:
-            if self.is_valid_move(move):
-                moves.append(move)
         return moves
 
 
 class Rook(Piece):
+    __slots__ = ()
+
     @property
     def piece_type(cls) -> PieceType:
         return PieceType.Rook
@@ -407,25 +393,13 @@ class Rook(Piece):
 
         return False
 
-    def _get_all_valid_moves(self) -> tp.List[Point]:
-        moves = []
-
-        x = self.pos.x
-        y = self.pos.y
-
-        for i in range(8):
-            v_move = Point(i, y)
-            h_move = Point(x, i)
-
-            if self.is_valid_move(v_move):
-                moves.append(v_move)
-            if self.is_valid_move(h_move):
-                moves.append(h_move)
-
-        return moves
+    def _pseudo_legal_targets(self, index: int) -> int:
+        return rook_attacks(index, self._board.occupied) & ~self._board.occupancy(self.color)
 
 
 class Knight(Piece):
+    __slots__ = ()
+
     @property
     def piece_type(cls) -> PieceType:
         return PieceType.Knight
@@ -434,33 +408,15 @@ class Knight(Piece):
         if self._check_illegal_move(pos, ignore_color=ignore_color):
             return False
 
-        v_distance = abs(self.pos.x - pos.x)
-        h_distance = abs(self.pos.y - pos.y)
+        return bool(KNIGHT_ATTACKS[self._pos.index] & BB_SQUARES[pos.index])
 
-        return ((v_distance == 1 and h_distance == 2) or
-                (v_distance == 2 and h_distance == 1))
-
-    def _get_all_valid_moves(self) -> tp.List[Point]:
-        moves = []
-        x = self.pos.x
-        y = self.pos.y
-
-        possible_moves = [Point(x + 1, y + 2),
-                          Point(x + 1, y - 2),
-                          Point(x - 1, y + 2),
-                          Point(x - 1, y - 2),
-                          Point(x + 2, y + 1),
-                          Point(x + 2, y - 1),
-                          Point(x - 2, y + 1),
-                          Point(x - 2, y - 1)]
-
-        for move in possible_moves:
-            if self.is_valid_move(move):
-                moves.append(move)
-        return moves
+    def _pseudo_legal_targets(self, index: int) -> int:
+        return KNIGHT_ATTACKS[index] & ~self._board.occupancy(self.color)
 
 
 class Bishop(Piece):
+    __slots__ = ()
+
     @property
     def piece_type(cls) -> PieceType:
         return PieceType.Bishop
@@ -477,10 +433,5 @@ class Bishop(Piece):
 
         return False
 
-    def _get_all_valid_moves(self) -> tp.List[Point]:
-        moves = []
-        for row, col in product(range(8), range(8)):
-            move = Point(row, col)
-            if self.is_valid_move(move):
-                moves.append(move)
-        return moves
+    def _pseudo_legal_targets(self, index: int) -> int:
+        return bishop_attacks(index, self._board.occupied) & ~self._board.occupancy(self.color)
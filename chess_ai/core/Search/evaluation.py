@@ -0,0 +1,37 @@
+'''
+Static evaluation, in centipawns from the point of view of the side to move.
+
+PIECE_VALUES are plain material values, as used to weigh up exchanges. The evaluation itself is the board's own
+tapered piece-square score.
+'''
+import typing as tp
+
+from chess_ai.core.Game.board import Board
+from chess_ai.core.Mechanics.bitboard import popcount
+from chess_ai.core.Mechanics.color import Color
+from chess_ai.core.Pieces.piece import PieceType
+
+
+PIECE_VALUES: tp.Dict[PieceType, int] = {
+        PieceType.King: 0,
+        PieceType.Queen: 900,
+        PieceType.Rook: 500,
+        PieceType.Bishop: 330,
+        PieceType.Knight: 320,
+        PieceType.Pawn: 100,
+}
+
+_VALUED_TYPES = tuple((piece_type, value) for piece_type, value in PIECE_VALUES.items() if value)
+
+
+def material(board: Board, color: Color) -> int:
+    return sum(value * popcount(board.bitboard(color, piece_type)) for piece_type, value in _VALUED_TYPES)
+
+
+def evaluate(board: Board) -> int:
+    '''
+    Tapered material & piece-square balance for the side to move. The board keeps both colors' scores up to date
+    as moves are pushed & popped, see piece_square
+    '''
+    score = round(board.white_score - board.black_score)
+    return score if board.turn == Color.White else -score
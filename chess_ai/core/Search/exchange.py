@@ -0,0 +1,74 @@
+'''
+Static exchange evaluation (SEE): what a capture wins or loses once both sides have traded off every piece they
+attack the square with, least valuable first, without playing a move.
+'''
+import typing as tp
+
+from chess_ai.core.Game.board import Board
+from chess_ai.core.Mechanics.bitboard import BB_SQUARES
+from chess_ai.core.Mechanics.color import Color, get_opposite_color
+from chess_ai.core.Mechanics.move import BoardMove
+from chess_ai.core.Pieces.piece import PieceType
+from chess_ai.core.Search.evaluation import PIECE_VALUES
+
+
+# A king can only take last, when nothing defends the square anymore, so it's worth more than anything it can win
+SEE_VALUES: tp.Dict[PieceType, int] = {**PIECE_VALUES, PieceType.King: 20_000}
+
+_LEAST_VALUABLE_FIRST = (PieceType.Pawn, PieceType.Knight, PieceType.Bishop, PieceType.Rook, PieceType.Queen,
+                         PieceType.King)
+
+
+def see(board: Board, move: BoardMove) -> int:
+    '''
+    Material the side to move wins (or loses, when negative) with a capture or promotion, in centipawns.
+
+    Each side may stop taking back whenever that's better for it. Pieces behind the ones that take are revealed as
+    they go, but pins and checks are ignored.
+    '''
+    end = move.end.index
+    piece = board[move.start]
+    victim = board[move.end]
+    occupied = board.occupied & ~BB_SQUARES[move.start.index]
+
+    if victim is not None:
+        gain = SEE_VALUES[victim.piece_type]
+    elif piece.piece_type == PieceType.Pawn and move.end == board.en_passant:
+        gain = SEE_VALUES[PieceType.Pawn]
+        occupied &= ~BB_SQUARES[end - 8 if piece.color == Color.White else end + 8]
+    else:
+        gain = 0
+
+    # The piece left standing on the square, for the other side to take next
+    on_square = piece.piece_type
+    if move.promotion is not None:
+        gain += SEE_VALUES[move.promotion] - SEE_VALUES[PieceType.Pawn]
+        on_square = move.promotion
+
+    gains = [gain]
+    color = get_opposite_color(piece.color)
+    while True:
+        attackers = board.attackers_of(end, color, occupied) & occupied
+        if not attackers:
+            break
+
+        for piece_type in _LEAST_VALUABLE_FIRST:
+            candidates = attackers & board.bitboard(color, piece_type)
+            if candidates:
+                break
+
+        bit = candidates & -candidates
+        if piece_type == PieceType.King and board.attackers_of(end, get_opposite_color(color), occupied ^ bit) \
+                & occupied:
+            break
+
+        # Each capture wins the piece on the square, less whatever the other side had won so far
+        gains.append(SEE_VALUES[on_square] - gains[-1])
+        on_square = piece_type
+        occupied ^= bit
+        color = get_opposite_color(color)
+
+    # Either side can decline to take back, keeping what it had at that point
+    for i in range(len(gains) - 1, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
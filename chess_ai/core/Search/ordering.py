@@ -0,0 +1,132 @@
+'''
+Move ordering for the search. Alpha-beta prunes the most when the best move is searched first, so moves are tried
+
+    1. the hash move, the best move found for the position before
+    2. captures & promotions, most valuable victim first, then least valuable attacker (MVV-LVA)
+    3. killer moves, quiet moves that caused a cutoff at the same ply elsewhere in the tree
+    4. the other quiet moves, by how many cutoffs they caused anywhere in the tree (history heuristic)
+    5. captures that lose material by static exchange evaluation, by MVV-LVA
+'''
+import typing as tp
+
+from chess_ai.core.Game.board import Board
+from chess_ai.core.Mechanics.color import Color
+from chess_ai.core.Mechanics.move import BoardMove
+from chess_ai.core.Pieces.piece import PieceType
+from chess_ai.core.Search.exchange import see
+
+
+# Deepest ply killer moves are kept for
+MAX_PLY = 128
+KILLERS_PER_PLY = 2
+
+# Ordering scores of the move classes, each above anything the next one can score
+_HASH_MOVE_SCORE = 1 << 30
+_CAPTURE_SCORE = 1 << 24
+_KILLER_SCORE = 1 << 22
+# History scores are halved once any reaches this, to stay below the killers and favour recent cutoffs
+_HISTORY_LIMIT = 1 << 20
+_LOSING_CAPTURE_SCORE = -(1 << 10)
+
+_VICTIM_RANKS = {
+        PieceType.Pawn: 1,
+        PieceType.Knight: 2,
+        PieceType.Bishop: 3,
+        PieceType.Rook: 4,
+        PieceType.Queen: 5,
+        PieceType.King: 6,
+}
+
+
+class MoveOrderer:
+    def __init__(self):
+        self.killers: tp.List[tp.List[tp.Optional[BoardMove]]] = [[None] * KILLERS_PER_PLY for _ in range(MAX_PLY)]
+        # Cutoffs by color & move, moves indexed by start index * 64 + end index
+        self.history: tp.Dict[Color, tp.List[int]] = {color: [0] * 4096 for color in Color}
+
+        # Nodes that failed high, and how many of them did on the first move searched
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def new_search(self) -> None:
+        '''Forgets the killers & statistics of the last search, and ages its history'''
+        for killers in self.killers:
+            killers[:] = [None] * KILLERS_PER_PLY
+        for history in self.history.values():
+            history[:] = [score >> 1 for score in history]
+        self.cutoffs = self.first_move_cutoffs = 0
+
+    @staticmethod
+    def capture_score(board: Board, move: BoardMove) -> int:
+        '''MVV-LVA score of a capture or promotion, 0 for a quiet move'''
+        attacker = board[move.start]
+        victim = board[move.end]
+        if victim is not None:
+            score = _VICTIM_RANKS[victim.piece_type] * 8 - _VICTIM_RANKS[attacker.piece_type]
+        elif attacker.piece_type == PieceType.Pawn and move.end == board.en_passant:
+            score = _VICTIM_RANKS[PieceType.Pawn] * 8 - _VICTIM_RANKS[PieceType.Pawn]
+        else:
+            score = 0
+
+        # A promotion wins the difference between its piece and the pawn
+        if move.promotion is not None:
+            score += (_VICTIM_RANKS[move.promotion] - _VICTIM_RANKS[PieceType.Pawn]) * 8
+        return score
+
+    def order(self, board: Board, moves: tp.List[BoardMove], ply: int,
+              hash_move: tp.Optional[BoardMove] = None) -> tp.List[BoardMove]:
+        '''Sorts the legal moves of the position on the board, best first'''
+        killers = self.killers[ply] if ply < MAX_PLY else ()
+        history = self.history[board.turn]
+        en_passant = board.en_passant
+
+        def score(move: BoardMove) -> int:
+            # The hash move might come from another position with the same key, it only counts if it's in the list
+            if move == hash_move:
+                return _HASH_MOVE_SCORE
+            # Most moves are quiet, capture_score is only worked out for the rest
+            victim = board[move.end]
+            if victim is not None or move.promotion is not None \
+                    or (move.end is en_passant and board[move.start].piece_type == PieceType.Pawn):
+                capture = self.capture_score(board, move)
+                # Taking a piece worth at least the attacker can't lose material, only the others need an SEE
+                if victim is not None and _VICTIM_RANKS[victim.piece_type] < _VICTIM_RANKS[
+                        board[move.start].piece_type] and see(board, move) < 0:
+                    return _LOSING_CAPTURE_SCORE + capture
+                return _CAPTURE_SCORE + capture
+            if move in killers:
+                return _KILLER_SCORE + KILLERS_PER_PLY - killers.index(move)
+            return history[move.start.index << 6 | move.end.index]
+
+        moves.sort(key=score, reverse=True)
+        return moves
+
+    def cutoff(self, board: Board, move: BoardMove, ply: int, depth: int, searched: int) -> None:
+        '''
+        Records a move of the position on the board failing high at `ply`, `depth` plies from the horizon, after
+        `searched` other moves
+        '''
+        self.cutoffs += 1
+        if searched == 0:
+            self.first_move_cutoffs += 1
+
+        # Captures are already searched early, only quiet moves need remembering
+        if self.capture_score(board, move):
+            return
+
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1:] = killers[:-1]
+                killers[0] = move
+
+        # Cutoffs far from the horizon save the most, and weigh the most
+        history = self.history[board.turn]
+        index = move.start.index << 6 | move.end.index
+        history[index] += depth * depth
+        if history[index] >= _HISTORY_LIMIT:
+            history[:] = [score >> 1 for score in history]
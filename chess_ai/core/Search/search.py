@@ -0,0 +1,336 @@
+'''
+Negamax alpha-beta search with iterative deepening, and a quiescence search of captures past the horizon.
+
+The search plays its moves on the board it's given with push & pop, and leaves it as it found it.
+
+Usage: python -m chess_ai.core.Search.search [--depth N] [--time SECONDS] [--position NAME | --fen FEN]
+'''
+import argparse
+import sys
+import time
+import typing as tp
+
+from chess_ai.core.Game.board import Board
+from chess_ai.core.Mechanics.move import BoardMove
+from chess_ai.core.Search.evaluation import evaluate
+from chess_ai.core.Search.exchange import see
+from chess_ai.core.Search.ordering import MoveOrderer
+from chess_ai.core.Search.transposition import DEFAULT_MB, Bound, TranspositionTable
+from chess_ai.core.perft import STANDARD_POSITIONS, move_str
+
+
+MATE_SCORE = 100_000
+INFINITY = 1_000_000
+# Scores beyond this are mates: MATE_SCORE less the plies to mate
+MATE_THRESHOLD = MATE_SCORE - 1_000
+
+# Node rate the benchmark (see `main`) expects to reach, averaged over the standard positions
+TARGET_NPS = 15_000
+
+# Nodes searched between checks of the time & node limits
+_LIMITS_INTERVAL = 1024
+
+
+class SearchResult(tp.NamedTuple):
+    best_move: tp.Optional[BoardMove]
+    # Principal variation, the line both sides are expected to play, starting with best_move
+    pv: tp.Tuple[BoardMove, ...]
+    # Centipawns for the side to move, see MATE_THRESHOLD for mates
+    score: int
+    # Depth of the deepest completed iteration
+    depth: int
+    nodes: int
+    seconds: float
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+
+class SearchAborted(Exception):
+    '''Unwinds an iteration that ran out of time or nodes'''
+    pass
+
+
+def format_score(score: int) -> str:
+    if score >= MATE_THRESHOLD:
+        return f'mate {(MATE_SCORE - score + 1) // 2}'
+    if score <= -MATE_THRESHOLD:
+        return f'mate -{(MATE_SCORE + score) // 2}'
+    return f'cp {score}'
+
+
+def score_to_table(score: int, ply: int) -> int:
+    '''Mate scores count plies from the root, the table keeps them counting from the position itself'''
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_table(score: int, ply: int) -> int:
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class Searcher:
+    def __init__(self, board: Board, table: tp.Optional[TranspositionTable] = None):
+        '''Searches `board`, with a table of DEFAULT_MB unless one is given, e.g. to share it between searches'''
+        self.board = board
+        self.table = table if table is not None else TranspositionTable(DEFAULT_MB)
+        self.ordering = MoveOrderer()
+        self.nodes = 0
+        # Nodes of those searched past the horizon
+        self.quiescence_nodes = 0
+
+        self._deadline: tp.Optional[float] = None
+        self._node_limit: tp.Optional[int] = None
+        self._can_abort = False
+
+        # Triangular PV table: the best line found from each ply of the current path
+        self._pv: tp.List[tp.List[BoardMove]] = []
+        # PV of the previous iteration, searched first while the current path still follows it
+        self._previous_pv: tp.Tuple[BoardMove, ...] = ()
+        self._follow_pv = False
+
+    def search(self, depth: int, time_limit: tp.Optional[float] = None, node_limit: tp.Optional[int] = None,
+               on_iteration: tp.Optional[tp.Callable[[SearchResult], None]] = None) -> SearchResult:
+        '''
+        Searches to `depth` plies by iterative deepening, searching 1, 2, ... plies deep in turn.
+
+        Once the time (in seconds) or node limit runs out, the iteration in progress is abandoned and the result of
+        the last completed one is returned. The first iteration always completes. `on_iteration` is handed the
+        result of every completed iteration.
+        '''
+        start = time.perf_counter()
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self._deadline = start + time_limit if time_limit is not None else None
+        self._node_limit = node_limit
+        self.table.new_search()
+        self.ordering.new_search()
+
+        result = SearchResult(None, (), 0, 0, 0, 0.0)
+        try:
+            for iteration in range(1, depth + 1):
+                self._can_abort = iteration > 1
+                self._pv = [[] for _ in range(iteration + 1)]
+                self._follow_pv = bool(self._previous_pv)
+
+                try:
+                    score = self._negamax(iteration, 0, -INFINITY, INFINITY)
+                except SearchAborted:
+                    break
+
+                pv = tuple(self._pv[0])
+                self._previous_pv = pv
+                result = SearchResult(pv[0] if pv else None, pv, score, iteration, self.nodes,
+                                      time.perf_counter() - start)
+                if on_iteration is not None:
+                    on_iteration(result)
+
+                # Iterative deepening finds the shortest mate first, searching deeper can't improve on it
+                if abs(score) >= MATE_THRESHOLD:
+                    break
+        finally:
+            self._previous_pv = ()
+            # The pieces' move caches were last filled in somewhere down the tree
+            self.board.invalidate_cache()
+
+        return result._replace(nodes=self.nodes, seconds=time.perf_counter() - start)
+
+    def _check_limits(self) -> None:
+        if not self._can_abort:
+            return
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchAborted()
+        if self._node_limit is not None and self.nodes >= self._node_limit:
+            raise SearchAborted()
+
+    def _order(self, moves: tp.List[BoardMove], ply: int, hash_move: tp.Optional[BoardMove]) -> tp.List[BoardMove]:
+        '''See MoveOrderer. While the path searched so far is the previous iteration's PV, its move goes first'''
+        if self._follow_pv:
+            if ply < len(self._previous_pv) and self._previous_pv[ply] in moves:
+                hash_move = self._previous_pv[ply]
+            else:
+                self._follow_pv = False
+        return self.ordering.order(self.board, moves, ply, hash_move)
+
+    def _negamax(self, depth: int, ply: int, alpha: int, beta: int) -> int:
+        self.nodes += 1
+        if self.nodes % _LIMITS_INTERVAL == 0:
+            self._check_limits()
+
+        board = self.board
+        self._pv[ply] = []
+
+        if ply > 0 and (board.halfmove_clock >= 100 or board.is_repetition()):
+            return 0
+
+        if depth == 0:
+            return self._quiescence(ply, alpha, beta)
+
+        key = board.zobrist_key
+        entry = self.table.probe(key)
+        hash_move = None
+        if entry is not None:
+            hash_move = entry.move
+            # The root always searches, to come back with a move
+            if ply > 0 and entry.depth >= depth:
+                score = score_from_table(entry.score, ply)
+                if entry.bound == Bound.Exact or (entry.bound == Bound.Lower and score >= beta) \
+                        or (entry.bound == Bound.Upper and score <= alpha):
+                    if entry.bound == Bound.Exact and hash_move is not None:
+                        self._pv[ply] = [hash_move]
+                    return score
+
+        board.invalidate_cache()
+        moves = board.legal_moves()
+        if not moves:
+            # Checkmate, sooner being worse, or stalemate
+            return -MATE_SCORE + ply if board.get_king(board.turn).in_check else 0
+
+        original_alpha = alpha
+        best = -INFINITY
+        best_move = None
+        for searched, move in enumerate(self._order(moves, ply, hash_move)):
+            board.push(move)
+            try:
+                score = -self._negamax(depth - 1, ply + 1, -beta, -alpha)
+            finally:
+                board.pop()
+
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    best_move = move
+                    self._pv[ply] = [move] + self._pv[ply + 1]
+                    if alpha >= beta:
+                        self.ordering.cutoff(board, move, ply, depth, searched)
+                        break
+
+            # Only the first move searched at a ply can continue the previous PV
+            self._follow_pv = False
+
+        if best >= beta:
+            bound = Bound.Lower
+        elif best > original_alpha:
+            bound = Bound.Exact
+        else:
+            bound = Bound.Upper
+        self.table.store(key, depth, bound, score_to_table(best, ply), best_move)
+
+        return best
+
+    def _quiescence(self, ply: int, alpha: int, beta: int) -> int:
+        '''
+        Searches captures & promotions only, until the position is quiet enough for its static evaluation to stand.
+
+        The side to move may always stand pat on the evaluation instead of capturing, except in check, where every
+        move is searched. Captures that lose material by static exchange evaluation are skipped.
+        '''
+        self.nodes += 1
+        self.quiescence_nodes += 1
+        if self.nodes % _LIMITS_INTERVAL == 0:
+            self._check_limits()
+
+        board = self.board
+        in_check = board.get_king(board.turn).in_check
+        if in_check:
+            best = -INFINITY
+        else:
+            best = evaluate(board)
+            if best >= beta:
+                return best
+            alpha = max(alpha, best)
+
+        board.invalidate_cache()
+        moves = board.legal_moves()
+        if in_check:
+            if not moves:
+                return -MATE_SCORE + ply
+            moves = self.ordering.order(board, moves, ply)
+        else:
+            capture_score = self.ordering.capture_score
+            moves = [move for move in moves if capture_score(board, move) and see(board, move) >= 0]
+            moves.sort(key=lambda move: capture_score(board, move), reverse=True)
+
+        for move in moves:
+            board.push(move)
+            try:
+                score = -self._quiescence(ply + 1, -beta, -alpha)
+            finally:
+                board.pop()
+
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        return best
+
+
+def search(board: Board, depth: int, time_limit: tp.Optional[float] = None,
+           node_limit: tp.Optional[int] = None, hash_mb: float = DEFAULT_MB) -> SearchResult:
+    '''See Searcher.search'''
+    return Searcher(board, TranspositionTable(hash_mb)).search(depth, time_limit, node_limit)
+
+
+def _print_iteration(result: SearchResult) -> None:
+    pv = ' '.join(move_str(move) for move in result.pv)
+    print(f'  depth {result.depth:>2}  {format_score(result.score):>10}  nodes {result.nodes:>9}  '
+          f'{result.seconds:8.3f}s  {result.nps:>8.0f} nps  pv {pv}')
+
+
+def main(argv: tp.Optional[tp.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Search positions and measure the node rate')
+    parser.add_argument('--depth', type=int, default=3, help='plies to search (default: 3)')
+    parser.add_argument('--time', type=float, help='seconds to search each position for, at most')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--position', choices=[position.name for position in STANDARD_POSITIONS],
+                       help='search a single standard position (default: all of them)')
+    group.add_argument('--fen', help='search an arbitrary position')
+    parser.add_argument('--hash', type=float, default=DEFAULT_MB,
+                        help=f'transposition table size in MB (default: {DEFAULT_MB})')
+    parser.add_argument('--target-nps', type=float, default=TARGET_NPS,
+                        help=f'node rate to check against (default: {TARGET_NPS})')
+    args = parser.parse_args(argv)
+
+    if args.fen is not None:
+        runs = [('fen', args.fen)]
+    else:
+        runs = [(position.name, position.fen) for position in STANDARD_POSITIONS
+                if args.position is None or args.position == position.name]
+
+    nodes = 0
+    seconds = 0.0
+    for name, fen in runs:
+        print(name)
+        searcher = Searcher(Board.from_fen(fen), TranspositionTable(args.hash))
+        result = searcher.search(args.depth, args.time, on_iteration=_print_iteration)
+        stats = searcher.table.stats()
+        print(f'  table  {stats["hits"]}/{stats["probes"]} hits ({stats["hit_rate"]:.1%})  '
+              f'{stats["collisions"]} collisions  {stats["usage"]:.1%} used of {stats["mb"]:g} MB')
+        print(f'  ordering  {searcher.ordering.cutoffs} cutoffs  '
+              f'{searcher.ordering.first_move_cutoff_rate:.1%} on the first move')
+        print(f'  quiescence  {searcher.quiescence_nodes} nodes  '
+              f'{searcher.quiescence_nodes / result.nodes if result.nodes else 0:.1%} of the total')
+        nodes += result.nodes
+        seconds += result.seconds
+
+    nps = nodes / seconds if seconds > 0 else float('inf')
+    ok = nps >= args.target_nps
+    status = 'ok' if ok else f'BELOW TARGET of {args.target_nps:.0f}'
+    print(f'total  nodes {nodes}  {seconds:.3f}s  {nps:.0f} nps  {status}')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+'''
+Transposition table: search results by position, so positions reached again through another move order aren't
+searched again.
+
+The table is allocated once, at a fixed size in MB, as two flat arrays of 64-bit words: each entry's zobrist key,
+and its data packed into a single word
+
+    bits  0-31   score, offset by 2**31
+    bits 32-39   depth
+    bits 40-41   bound, 0 for an empty entry
+    bits 42-56   best move: start index, end index << 6, promotion << 12, 0 for none
+    bits 57-63   generation, the search that stored the entry
+
+Entries come in buckets of two: a depth-preferred slot, only replaced by a search at least as deep or by a later
+search, and an always-replace slot taking whatever the first slot turned down. Being fixed-size, the table uses the
+same memory however long it's used for.
+'''
+import typing as tp
+from array import array
+from enum import IntEnum
+
+from chess_ai.core.Mechanics.move import BoardMove
+from chess_ai.core.Mechanics.point import SQUARES
+from chess_ai.core.Pieces.piece import PieceType
+
+
+# Bytes per entry: a key and a data word
+ENTRY_SIZE = 16
+DEFAULT_MB = 16
+
+_SCORE_OFFSET = 1 << 31
+_SCORE_MASK = (1 << 32) - 1
+_MAX_DEPTH = (1 << 8) - 1
+_GENERATIONS = 1 << 7
+
+_PROMOTIONS: tp.Tuple[tp.Optional[PieceType], ...] = (
+        None, PieceType.Queen, PieceType.Rook, PieceType.Bishop, PieceType.Knight)
+_PROMOTION_CODES = {promotion: code for code, promotion in enumerate(_PROMOTIONS)}
+
+
+class Bound(IntEnum):
+    # The score is exact, or only a bound because the search was cut off above beta or failed below alpha
+    Exact = 1
+    Lower = 2
+    Upper = 3
+
+
+class TableEntry(tp.NamedTuple):
+    depth: int
+    bound: Bound
+    score: int
+    move: tp.Optional[BoardMove]
+
+
+def encode_move(move: tp.Optional[BoardMove]) -> int:
+    if move is None:
+        return 0
+    return move.start.index | move.end.index << 6 | _PROMOTION_CODES[move.promotion] << 12
+
+
+def decode_move(code: int) -> tp.Optional[BoardMove]:
+    # A move's start & end differ, so a 0 can't be one
+    if code == 0:
+        return None
+    return BoardMove(SQUARES[code & 63], SQUARES[code >> 6 & 63], _PROMOTIONS[code >> 12])
+
+
+class TranspositionTable:
+    def __init__(self, mb: float = DEFAULT_MB):
+        '''A table of at most `mb` MB, rounded down to a power of two buckets'''
+        buckets = max(int(mb * (1 << 20)) // (2 * ENTRY_SIZE), 1)
+        self.buckets = 1 << (buckets.bit_length() - 1)
+        self._mask = self.buckets - 1
+
+        self._keys = array('Q', bytes(8 * 2 * self.buckets))
+        self._data = array('Q', bytes(8 * 2 * self.buckets))
+        self._generation = 0
+
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        # Stores that evicted another position's entry
+        self.collisions = 0
+
+    def __len__(self) -> int:
+        '''Entries the table can hold'''
+        return 2 * self.buckets
+
+    @property
+    def mb(self) -> float:
+        return len(self) * ENTRY_SIZE / (1 << 20)
+
+    def new_search(self) -> None:
+        '''Ages every entry stored so far, letting the depth-preferred slots go to the next search'''
+        self._generation = (self._generation + 1) % _GENERATIONS
+
+    def clear(self) -> None:
+        for words in (self._keys, self._data):
+            words[:] = array('Q', bytes(8 * len(words)))
+        self._generation = 0
+        self.probes = self.hits = self.stores = self.collisions = 0
+
+    def probe(self, key: int) -> tp.Optional[TableEntry]:
+        self.probes += 1
+        slot = (key & self._mask) << 1
+        keys = self._keys
+        if keys[slot] != key:
+            slot += 1
+            if keys[slot] != key:
+                return None
+
+        data = self._data[slot]
+        bound = data >> 40 & 3
+        if not bound:
+            return None
+
+        self.hits += 1
+        return TableEntry(
+                depth=data >> 32 & _MAX_DEPTH,
+                bound=Bound(bound),
+                score=(data & _SCORE_MASK) - _SCORE_OFFSET,
+                move=decode_move(data >> 42 & 0x7fff),
+        )
+
+    def store(self, key: int, depth: int, bound: Bound, score: int, move: tp.Optional[BoardMove]) -> None:
+        self.stores += 1
+        keys = self._keys
+        data = self._data
+        bucket = (key & self._mask) << 1
+
+        # The depth-preferred slot, unless it holds a deeper search of another position from this search
+        slot = bucket
+        old = data[slot]
+        if keys[slot] != key and old >> 40 & 3 and old >> 57 == self._generation \
+                and old >> 32 & _MAX_DEPTH > depth:
+            slot += 1
+            old = data[slot]
+
+        move_code = encode_move(move)
+        if keys[slot] == key:
+            # A search that didn't find a best move, failing low, keeps the one found before
+            if not move_code:
+                move_code = old >> 42 & 0x7fff
+        elif old >> 40 & 3:
+            self.collisions += 1
+
+        keys[slot] = key
+        data[slot] = ((score + _SCORE_OFFSET) & _SCORE_MASK | min(depth, _MAX_DEPTH) << 32 | bound << 40
+                      | move_code << 42 | self._generation << 57)
+
+    def usage(self, sample: int = 1000) -> float:
+        '''Fraction of the first `sample` entries that hold something from the current search'''
+        sample = min(sample, len(self))
+        data = self._data
+        used = sum(1 for slot in range(sample) if data[slot] >> 40 & 3 and data[slot] >> 57 == self._generation)
+        return used / sample
+
+    def stats(self) -> tp.Dict[str, tp.Union[int, float]]:
+        return dict(
+                probes=self.probes,
+                hits=self.hits,
+                hit_rate=self.hits / self.probes if self.probes else 0.0,
+                stores=self.stores,
+                collisions=self.collisions,
+                entries=len(self),
+                mb=self.mb,
+                usage=self.usage(),
+        )
@@ -0,0 +1,179 @@
+'''
+Byte-offset index of the games in a PGN file, for random access into large databases.
+
+The index is built with a single pass over the memory-mapped PGN and saved next to it in a compact binary sidecar:
+
+    header    magic, version, key header count, game count, PGN size & modification time, records offset
+    headers   each game's key header values, utf-8, separated by US (0x1f) characters
+    records   one fixed-size record per game: byte offset & length in the PGN, offset & length of its key headers
+
+Being fixed-size, the record of any game is found with a single seek, so opening a game doesn't depend on how many
+games there are.
+'''
+import mmap
+import os
+import re
+import struct
+import typing as tp
+
+
+TAG_RE = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+
+_TAG_LINE_RE = re.compile(rb'^[ \t]*\[[ \t]*(\w+)[ \t]+"((?:[^"\\\n]|\\.)*)"[^\n]*', re.MULTILINE)
+_NON_SPACE_RE = re.compile(rb'\S')
+
+_MAGIC = b'PGNI'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHQQqQ')
+_RECORD = struct.Struct('<QQQI')
+_SEPARATOR = '\x1f'
+
+
+def unescape_tag_value(value: str) -> str:
+    return value.replace('\\"', '"').replace('\\\\', '\\')
+
+
+def _source_stat(pgn_fp: str) -> tp.Tuple[int, int]:
+    stat = os.stat(pgn_fp)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _map(f) -> tp.Optional[mmap.mmap]:
+    # Empty files can't be mapped
+    if os.fstat(f.fileno()).st_size == 0:
+        return None
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PgnIndex:
+    # Headers kept in the index, so games can be looked through without opening them
+    KEY_HEADERS = ('Event', 'Site', 'Date', 'White', 'Black', 'Result')
+
+    def __init__(self, pgn_fp: str, index_fp: tp.Optional[str] = None):
+        '''Opens an existing index, see `open` to have it built when it's missing or out of date'''
+        self.pgn_fp = pgn_fp
+        self.index_fp = index_fp or self.default_index_fp(pgn_fp)
+
+        self._index_file = open(self.index_fp, 'rb')
+        self._index = _map(self._index_file)
+        header = self._index[:_HEADER.size] if self._index is not None else b''
+        if len(header) != _HEADER.size:
+            self.close()
+            raise ValueError(f'Not a PGN index: {self.index_fp}')
+
+        magic, version, key_header_count, self._count, size, mtime_ns, self._records_offset = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION or key_header_count != len(self.KEY_HEADERS):
+            self.close()
+            raise ValueError(f'Not a PGN index, or one from another version: {self.index_fp}')
+        self.source_stat = (size, mtime_ns)
+
+        self._pgn_file = open(pgn_fp, 'rb')
+        self._pgn = _map(self._pgn_file)
+
+    @staticmethod
+    def default_index_fp(pgn_fp: str) -> str:
+        return pgn_fp + '.idx'
+
+    @classmethod
+    def build(cls, pgn_fp: str, index_fp: tp.Optional[str] = None) -> 'PgnIndex':
+        '''
+        Scans a PGN file once and writes its index.
+
+        A game starts at the first tag pair line following some move text, or at the start of the file. Only the
+        record table is kept in memory while scanning, at a few dozen bytes per game.
+        '''
+        index_fp = index_fp or cls.default_index_fp(pgn_fp)
+        size, mtime_ns = _source_stat(pgn_fp)
+
+        records = bytearray()
+        with open(pgn_fp, 'rb') as pgn_file, open(index_fp, 'wb') as index_file:
+            index_file.write(b'\0' * _HEADER.size)
+            headers_offset = 0
+
+            def add_game(start: int, end: int, headers: tp.Dict[str, str]):
+                nonlocal headers_offset
+                encoded = _SEPARATOR.join(headers.get(key, '') for key in cls.KEY_HEADERS).encode('utf-8')
+                index_file.write(encoded)
+                records.extend(_RECORD.pack(start, end - start, headers_offset, len(encoded)))
+                headers_offset += len(encoded)
+
+            pgn = _map(pgn_file)
+            if pgn is not None:
+                with pgn:
+                    start = 0
+                    headers: tp.Dict[str, str] = {}
+                    previous_end = 0
+                    for tag in _TAG_LINE_RE.finditer(pgn):
+                        # Any move text since the last tag pair means this one opens the next game
+                        if _NON_SPACE_RE.search(pgn, previous_end, tag.start()):
+                            add_game(start, tag.start(), headers)
+                            start = tag.start()
+                            headers = {}
+                        previous_end = tag.end()
+
+                        name = tag.group(1).decode('ascii')
+                        if name in cls.KEY_HEADERS:
+                            headers[name] = unescape_tag_value(tag.group(2).decode('utf-8', errors='replace'))
+
+                    if _NON_SPACE_RE.search(pgn, start):
+                        add_game(start, len(pgn), headers)
+
+            records_offset = _HEADER.size + headers_offset
+            index_file.write(records)
+            index_file.seek(0)
+            index_file.write(_HEADER.pack(_MAGIC, _VERSION, len(cls.KEY_HEADERS), len(records) // _RECORD.size,
+                                          size, mtime_ns, records_offset))
+
+        return cls(pgn_fp, index_fp)
+
+    @classmethod
+    def open(cls, pgn_fp: str, index_fp: tp.Optional[str] = None) -> 'PgnIndex':
+        '''Opens the index of a PGN file, (re)building it first if it's missing or the PGN changed since'''
+        try:
+            index = cls(pgn_fp, index_fp)
+        except (OSError, ValueError):
+            return cls.build(pgn_fp, index_fp)
+
+        if index.source_stat != _source_stat(pgn_fp):
+            index.close()
+            return cls.build(pgn_fp, index_fp)
+        return index
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, n: int) -> tp.Tuple[int, int, int, int]:
+        if not 0 <= n < self._count:
+            raise IndexError(f'Game {n} out of range, the index has {self._count}')
+        return _RECORD.unpack_from(self._index, self._records_offset + n * _RECORD.size)
+
+    def span(self, n: int) -> tp.Tuple[int, int]:
+        '''Byte offset & length of game `n` in the PGN file'''
+        offset, length, _, _ = self._record(n)
+        return offset, length
+
+    def headers(self, n: int) -> tp.Dict[str, str]:
+        '''The key headers game `n` has, without opening the game'''
+        _, _, headers_offset, headers_length = self._record(n)
+        start = _HEADER.size + headers_offset
+        values = self._index[start:start + headers_length].decode('utf-8').split(_SEPARATOR)
+        return {key: value for key, value in zip(self.KEY_HEADERS, values) if value}
+
+    def read_game(self, n: int) -> str:
+        '''The PGN text of game `n`'''
+        offset, length = self.span(n)
+        return self._pgn[offset:offset + length].decode('utf-8', errors='replace')
+
+    def close(self) -> None:
+        for mapped in (getattr(self, '_pgn', None), self._index):
+            if mapped is not None:
+                mapped.close()
+        for f in (getattr(self, '_pgn_file', None), self._index_file):
+            if f is not None:
+                f.close()
+
+    def __enter__(self) -> 'PgnIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
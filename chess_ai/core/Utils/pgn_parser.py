@@ -1,17 +1,87 @@
 from collections import namedtuple
 from enum import Enum
+from functools import lru_cache
+import re
 import typing as tp
 
 from chess_ai.core.Pieces.piece import PieceType
 from chess_ai.core.Mechanics.color import Color
 from chess_ai.core.Mechanics.point import Point
-from chess_ai.core.Mechanics.move import Move, Castle
+from chess_ai.core.Mechanics.move import Move, SanMove, Castle
+from chess_ai.core.Utils.pgn_index import PgnIndex, TAG_RE, unescape_tag_value
 
 
 class UnknownMove(Exception):
     pass
 
 
+# SAN moves parse_san keeps parsed, per color
+SAN_CACHE_SIZE = 8192
+
+RESULTS = frozenset(('1-0', '0-1', '1/2-1/2', '*'))
+
+# Comment & variation delimiters, or a run of anything else. "(ep)" sticks to the move it marks
+_TOKEN_RE = re.compile(r'[^\s{};()]+(?:\(ep\))?|[{};()]')
+_MOVE_NUMBER_RE = re.compile(r'^\d+\.+')
+
+
+def _iter_games(lines: tp.Iterable[str]) -> tp.Generator[tp.Tuple[tp.Dict[str, str], tp.List[str]], None, None]:
+    '''Tag pairs & SAN moves of every game in PGN text, one line at a time'''
+    headers: tp.Dict[str, str] = {}
+    sans: tp.List[str] = []
+    in_comment = False
+    variation_depth = 0
+
+    for line in lines:
+        if not in_comment and variation_depth == 0:
+            stripped = line.strip()
+            if not stripped or stripped[0] == '%':
+                continue
+
+            if stripped[0] == '[':
+                # Tags after some moves belong to the next game, whose previous one had no result
+                if sans:
+                    yield headers, sans
+                    headers, sans = {}, []
+
+                tag = TAG_RE.match(stripped)
+                if tag is not None:
+                    headers[tag.group(1)] = unescape_tag_value(tag.group(2))
+                continue
+
+        for token in _TOKEN_RE.findall(line):
+            if in_comment:
+                in_comment = token != '}'
+            elif token == '{':
+                in_comment = True
+            elif token == ';':
+                break
+            elif token == '(':
+                variation_depth += 1
+            elif token == ')':
+                variation_depth = max(variation_depth - 1, 0)
+            elif variation_depth or token[0] == '$':
+                continue
+            elif token in RESULTS:
+                yield headers, sans
+                headers, sans = {}, []
+            else:
+                san = _MOVE_NUMBER_RE.sub('', token).rstrip('+#!?')
+                if san:
+                    sans.append(san)
+
+    if sans or headers:
+        yield headers, sans
+
+
+def _pair_moves(sans: tp.List[str]) -> tp.List[tp.Tuple[str, str]]:
+    '''White & black move pairs, the last black move left empty when white moved last'''
+    moves = list(zip(sans[::2], sans[1::2]))
+    if len(sans) % 2:
+        moves.append((sans[-1], ''))
+    return moves
+
+
 class Parser:
     _PIECE_MAP = dict(
             K=PieceType.King,
@@ -22,64 +92,28 @@ class Parser:
     )
 
     @classmethod
-    def from_pgn(cls, fp: str):
-        def strip_comments(line, is_multiline_comment):
-            if is_multiline_comment:
-                ending = line.find('}')
-                if ending != -1:
-                    return line[ending+1:], False
-                return '', True
-
-            semicolon = line.find(';')
-            if semicolon != -1:
-                return line[:semicolon], False
-
-            start = line.find('{')
-            end = line.find('}')
-            if start != -1:
-                if line.find('}') == -1:
-                    return line[:start], True
-                return line[:start], False
-            return line, False
-
-        def iter_tuplets(iterable):
-            it = iter(iterable)
-            while True:
-                try:
-                    first = next(it)
-                except StopIteration:
-                    return
-
-                first = first[first.find('.')+1:]
-
-                try:
-                    yield first, next(it)
-                except StopIteration:
-                    yield first, ''
-                    return
-
-        core_lines = []
-        intro = True
-        is_multiline_comment = False
-
-        with open(fp, 'r') as f:
-            lines = f.read()
-
-        for drop in ('1/2-1/2', '1-0', '0-1', '+', '#'):
-            lines = lines.replace(drop, '')
-
-        for line in lines.splitlines():
-            if not intro:
-                line, is_multiline_comment = strip_comments(line, is_multiline_comment)
-                core_lines.append(line)
-            else:
-                if line[:2] == '1.':
-                    line, is_multiline_comment = strip_comments(line, is_multiline_comment)
-                    core_lines.append(line)
-                    intro = False
+    def iter_pgn(cls, fp: str) -> tp.Generator['Parser', None, None]:
+        '''
+        Streams every game of a PGN file, one Parser per game with its tag pairs in `headers`.
+
+        The file is read a line at a time and only the game being read is held in memory, so databases of any size
+        can be walked through. Comments, variations, NAGs and move annotations are dropped.
+        '''
+        with open(fp, 'r', encoding='utf-8', errors='replace') as f:
+            for headers, sans in _iter_games(f):
+                yield cls(_pair_moves(sans), headers)
 
-        raw_moves = ' '.join(core_lines).replace('\n', ' ').replace('  ', ' ').replace('. ', '.').split()
-        return cls(list(iter_tuplets(raw_moves)))
+    @classmethod
+    def from_index(cls, index: PgnIndex, n: int) -> 'Parser':
+        '''Game `n` of an indexed PGN file, read straight from its byte offset'''
+        for headers, sans in _iter_games(index.read_game(n).splitlines()):
+            return cls(_pair_moves(sans), headers)
+        return cls([])
+
+    @classmethod
+    def from_pgn(cls, fp: str):
+        '''The first game of a PGN file'''
+        return next(cls.iter_pgn(fp), None) or cls([])
 
     @classmethod
     def from_fools_mate(cls):
@@ -116,11 +150,35 @@ class Parser:
 
         return cls(sample_games[key])
 
-    def __init__(self, moves):
+    def __init__(self, moves, headers: tp.Optional[tp.Dict[str, str]] = None):
         self.moves = moves
+        self.headers: tp.Dict[str, str] = headers if headers is not None else {}
 
     @classmethod
     def parse_move(cls, move: str, color: Color) -> Move:
+        '''Parses a SAN move, along with a description of it for display. See `parse_san`'''
+        san_move = cls.parse_san(move, color)
+
+        if san_move.castle is not None:
+            action = ''
+        elif san_move.en_passant:
+            action = ' en passants to '
+        elif 'x' in move:
+            action = ' captures piece on '
+        else:
+            action = ' moves to '
+
+        return Move(*san_move, action=action)
+
+    @staticmethod
+    @lru_cache(maxsize=SAN_CACHE_SIZE)
+    def parse_san(move: str, color: Color) -> SanMove:
+        '''
+        Parses a SAN move into what it takes to play it.
+
+        Games keep reusing a small vocabulary of SAN tokens, so parsed moves are memoized by (SAN, color) in a
+        bounded LRU cache, see `san_cache_stats`. SanMove records are immutable, so they're shared freely.
+        '''
         og_move = move
         if '+' in move:
             move = move.replace('+', '')
@@ -130,7 +188,7 @@ class Parser:
 
         upgrade = None
         if '=' in move:
-            upgrade = cls._PIECE_MAP[move[-1]]
+            upgrade = Parser._PIECE_MAP[move[-1]]
             move = move[:-2]
 
         en_passant = False
@@ -138,7 +196,6 @@ class Parser:
             en_passant = True
             move = move[:-4]
 
-        action = ''
         destination = None
         castle = None
         col_helper = None
@@ -147,7 +204,6 @@ class Parser:
         if len(move) == 2:
             piece = PieceType.Pawn
             destination = Point.from_str(move)
-            action = ' moves to '
         elif move in ('0-0', 'O-O'):
             piece = PieceType.King
             castle = Castle.Kingside
@@ -155,16 +211,17 @@ class Parser:
             piece = PieceType.King
             castle = Castle.Queenside
         else:
+            piece = Parser._PIECE_MAP.get(move[0], PieceType.Pawn)
+
             post = move.split('x')
             if len(post) == 1:
-                action = ' moves to '
                 prefix, dest_str = move[1:-2], move[-2:]
             else:
-                action = ' captures piece on '
                 prefix, dest_str = post
-                prefix = prefix[1:]
+                # Pawn captures lead with the pawn's file rather than a piece letter, e.g. axb5
+                if piece != PieceType.Pawn:
+                    prefix = prefix[1:]
 
-            piece = cls._PIECE_MAP.get(move[0], PieceType.Pawn)
             destination = Point.from_str(dest_str)
 
             if len(prefix) == 0:
@@ -180,10 +237,7 @@ class Parser:
             else:
                 raise UnknownMove(move)
 
-        if en_passant:
-            action = ' en passants to '
-
-        return Move(
+        return SanMove(
                 move=og_move,
                 color=color,
                 piece=piece,
@@ -193,20 +247,34 @@ class Parser:
                 en_passant=en_passant,
                 upgrade=upgrade,
                 castle=castle,
-                action=action,
         )
 
-    def yield_moves(self) -> tp.Generator[tp.Tuple[Move, Move], None, None]:
+    @classmethod
+    def san_cache_stats(cls) -> tp.Dict[str, float]:
+        '''Hits, misses, current & maximum size and hit rate of the `parse_san` cache'''
+        info = cls.parse_san.cache_info()
+        lookups = info.hits + info.misses
+        return dict(
+                hits=info.hits,
+                misses=info.misses,
+                size=info.currsize,
+                max_size=info.maxsize,
+                hit_rate=info.hits / lookups if lookups else 0.0,
+        )
+
+    def yield_moves(self) -> tp.Generator[tp.Tuple[SanMove, tp.Optional[SanMove]], None, None]:
+        '''The game's moves, parsed & paired by move number. The last black move is None if white moved last'''
+        parse_san = self.parse_san
         for white_move, black_move in self.moves:
             if not white_move:
                 break
 
-            white = self.parse_move(white_move, Color.White)
+            white = parse_san(white_move, Color.White)
 
             if not black_move:
                 yield white, None
                 break
 
-            black = self.parse_move(black_move, Color.Black)
+            black = parse_san(black_move, Color.Black)
 
             yield white, black
@@ -0,0 +1,235 @@
+'''
+Perft: counts the leaf nodes of the legal move tree to a fixed depth, to check move generation against known
+node counts and to measure its speed.
+
+Usage: python -m chess_ai.core.perft [--depth N] [--position NAME | --fen FEN] [--divide] [--jobs N] [--hash]
+'''
+import argparse
+import os
+import sys
+import time
+import typing as tp
+from concurrent.futures import ProcessPoolExecutor
+
+from chess_ai.core.Game.board import Board
+from chess_ai.core.Mechanics.move import BoardMove
+from chess_ai.core.Mechanics.point import Point
+from chess_ai.core.Pieces.piece import PieceType
+
+
+class PerftPosition(tp.NamedTuple):
+    name: str
+    fen: str
+    # Known node counts, starting at depth 1
+    nodes: tp.Tuple[int, ...]
+
+
+# Well-known positions & node counts, see https://www.chessprogramming.org/Perft_Results
+STANDARD_POSITIONS: tp.Tuple[PerftPosition, ...] = (
+        PerftPosition('start', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+                      (20, 400, 8902, 197281, 4865609)),
+        PerftPosition('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                      (48, 2039, 97862, 4085603)),
+        PerftPosition('position3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+                      (14, 191, 2812, 43238, 674624)),
+        PerftPosition('position4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+                      (6, 264, 9467, 422333)),
+        PerftPosition('position5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+                      (44, 1486, 62379, 2103487)),
+        PerftPosition('position6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+                      (46, 2079, 89890, 3894594)),
+)
+
+_PROMOTION_CHARS = {'q': PieceType.Queen, 'r': PieceType.Rook, 'b': PieceType.Bishop, 'n': PieceType.Knight}
+
+# Entries a worker's transposition table may hold before it's cleared out
+MAX_TABLE_ENTRIES = 1 << 21
+
+def perft(board: Board, depth: int) -> int:
+    '''Number of leaf nodes of the legal move tree `depth` plies deep'''
+    if depth == 0:
+        return 1
+
+    board.invalidate_cache()
+    moves = board.legal_moves()
+
+    # Bulk count the last ply, the moves don't need to be played to be counted
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        board.push(move)
+        nodes += perft(board, depth - 1)
+        board.pop()
+        board.invalidate_cache()
+    return nodes
+
+
+def perft_cached(board: Board, depth: int, table: tp.Dict[tp.Tuple[int, int], int]) -> int:
+    '''Like perft, but counts every (position, depth) subtree only once, looking repeats up in `table`'''
+    if depth == 0:
+        return 1
+
+    key = (board.zobrist_key, depth)
+    nodes = table.get(key)
+    if nodes is not None:
+        return nodes
+
+    board.invalidate_cache()
+    moves = board.legal_moves()
+
+    if depth == 1:
+        nodes = len(moves)
+    else:
+        nodes = 0
+        for move in moves:
+            board.push(move)
+            nodes += perft_cached(board, depth - 1, table)
+            board.pop()
+            board.invalidate_cache()
+
+    if len(table) >= MAX_TABLE_ENTRIES:
+        table.clear()
+    table[key] = nodes
+    return nodes
+
+
+def move_str(move: BoardMove) -> str:
+    '''Long algebraic notation, e.g. e2e4 or a7a8q'''
+    s = move.start.to_str().lower() + move.end.to_str().lower()
+    if move.promotion is not None:
+        s += 'n' if move.promotion == PieceType.Knight else move.promotion.value[0].lower()
+    return s
+
+
+def parse_move_str(s: str) -> BoardMove:
+    '''Inverse of move_str'''
+    return BoardMove(Point.from_str(s[:2]), Point.from_str(s[2:4]), _PROMOTION_CHARS.get(s[4:]))
+
+
+def divide(board: Board, depth: int) -> tp.Dict[str, int]:
+    '''Perft node counts below each legal root move'''
+    counts = {}
+    board.invalidate_cache()
+    for move in board.legal_moves():
+        board.push(move)
+        counts[move_str(move)] = perft(board, depth - 1)
+        board.pop()
+        board.invalidate_cache()
+    return counts
+
+
+# Each worker process keeps its transposition table across the tasks it's handed
+_worker_table: tp.Dict[tp.Tuple[int, int], int] = {}
+
+
+def _perft_task(fen: str, path: tp.Tuple[str, ...], depth: int, cached: bool) -> int:
+    '''
+    Runs in a worker process. Positions travel as a FEN plus the moves played from it, which is much cheaper to
+    send than a pickled Board and its pieces
+    '''
+    board = Board.from_fen(fen)
+    for move in path:
+        board.push(parse_move_str(move))
+    if cached:
+        return perft_cached(board, depth, _worker_table)
+    return perft(board, depth)
+
+
+def _split(board: Board, plies: int) -> tp.List[tp.Tuple[str, ...]]:
+    '''Every legal move path `plies` deep. Paths into a position without legal moves stop there, and hold no nodes'''
+    if plies == 0:
+        return [()]
+
+    board.invalidate_cache()
+    paths = []
+    for move in board.legal_moves():
+        board.push(move)
+        paths.extend((move_str(move),) + path for path in _split(board, plies - 1))
+        board.pop()
+        board.invalidate_cache()
+    return paths
+
+
+def parallel_divide(fen: str, depth: int, jobs: tp.Optional[int] = None, split_plies: int = 1,
+                    cached: bool = False) -> tp.Dict[str, int]:
+    '''
+    Perft node counts below each root move, with the subtrees spread over a pool of worker processes.
+
+    The work is split by root move, or by the first `split_plies` plies for more, smaller tasks that keep a large
+    pool busy. Each worker counts its subtrees from scratch, or with a transposition table when `cached`.
+    '''
+    split_plies = max(1, min(split_plies, depth))
+    board = Board.from_fen(fen)
+    paths = _split(board, split_plies)
+
+    # Seed every root move, some might lead nowhere once split 2 plies deep
+    counts = {move_str(move): 0 for move in board.legal_moves()}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [(path, executor.submit(_perft_task, fen, path, depth - len(path), cached)) for path in paths]
+        for path, future in futures:
+            counts[path[0]] += future.result()
+    return counts
+
+
+def _run(name: str, fen: str, depth: int, expected: tp.Optional[int], show_divide: bool,
+         jobs: int = 1, split_plies: int = 1, cached: bool = False) -> bool:
+    start = time.perf_counter()
+    if jobs > 1:
+        counts = parallel_divide(fen, depth, jobs, split_plies, cached)
+        nodes = sum(counts.values())
+    elif show_divide:
+        counts = divide(Board.from_fen(fen), depth)
+        nodes = sum(counts.values())
+    elif cached:
+        nodes = perft_cached(Board.from_fen(fen), depth, {})
+    else:
+        nodes = perft(Board.from_fen(fen), depth)
+    elapsed = time.perf_counter() - start
+
+    if show_divide:
+        for move, count in sorted(counts.items()):
+            print(f'  {move}: {count}')
+
+    ok = expected is None or nodes == expected
+    status = '' if expected is None else ('  ok' if ok else f'  MISMATCH, expected {expected}')
+    nps = nodes / elapsed if elapsed > 0 else float('inf')
+    print(f'{name:<10} depth {depth}  nodes {nodes:>10}  {elapsed:8.3f}s  {nps:>10.0f} nps{status}')
+    return ok
+
+
+def main(argv: tp.Optional[tp.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Count move generation leaf nodes and measure their speed')
+    parser.add_argument('--depth', type=int, default=3, help='plies to search (default: 3)')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--position', choices=[position.name for position in STANDARD_POSITIONS],
+                       help='run a single standard position (default: all of them)')
+    group.add_argument('--fen', help='run an arbitrary position, without a known node count to check against')
+    parser.add_argument('--divide', action='store_true', help='print the node count below each root move')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='worker processes to split the tree over, 0 for one per CPU (default: 1)')
+    parser.add_argument('--split', type=int, default=1, choices=(1, 2),
+                        help='plies to split the tree by when running in parallel (default: 1)')
+    parser.add_argument('--hash', action='store_true',
+                        help='count repeated subtrees once, using a transposition table')
+    args = parser.parse_args(argv)
+    jobs = args.jobs or os.cpu_count() or 1
+
+    if args.fen is not None:
+        runs = [('fen', args.fen, None)]
+    else:
+        runs = []
+        for position in STANDARD_POSITIONS:
+            if args.position is None or args.position == position.name:
+                expected = position.nodes[args.depth - 1] if args.depth <= len(position.nodes) else None
+                runs.append((position.name, position.fen, expected))
+
+    ok = True
+    for name, fen, expected in runs:
+        ok &= _run(name, fen, args.depth, expected, args.divide, jobs, args.split, args.hash)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+'''
+Batch replay: plays every game of a PGN database back on a Board, checking each SAN move resolves to a legal move.
+
+Games are spread over a pool of worker processes, which read them straight from the PGN through its byte-offset
+index. Nothing is printed and nothing is asked for while replaying.
+
+Usage: python -m chess_ai.core.replay PGN [--jobs N] [--chunk-size N] [--errors]
+'''
+import argparse
+import os
+import sys
+import time
+import typing as tp
+from concurrent.futures import ProcessPoolExecutor
+
+from chess_ai.core.Game.board import Board
+from chess_ai.core.Mechanics.status import Status
+from chess_ai.core.Pieces.piece import PieceType
+from chess_ai.core.Utils.pgn_index import PgnIndex
+from chess_ai.core.Utils.pgn_parser import Parser
+
+
+class ReplayResult(tp.NamedTuple):
+    # Number of the game in its PGN file, from 0
+    game: int
+    headers: tp.Dict[str, str]
+    # Status of the side to move once the game's moves are played out, or as far as they could be
+    status: Status
+    plies: int
+    # The SAN move that couldn't be played and why, if any
+    error_san: tp.Optional[str]
+    error: tp.Optional[str]
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def replay_game(parser: Parser, game: int = 0) -> ReplayResult:
+    '''Plays a parsed game out on a fresh board, stopping at the first move that isn't exactly one legal move'''
+    start = time.perf_counter()
+    board = Board()
+    plies = 0
+    error_san = None
+    error = None
+
+    try:
+        for move in (move for pair in parser.yield_moves() for move in pair if move is not None):
+            error_san = move.move
+
+            # Raises IllegalMove or AmbiguousMove unless the move names exactly one legal move
+            piece, destination, promotion = board.parse_points_from_move(move)
+
+            # A pawn reaching the last row without a promotion piece becomes a queen, rather than prompting
+            if promotion is None and piece.piece_type == PieceType.Pawn and destination.x in (0, 7):
+                promotion = PieceType.Queen
+
+            board.perform_move(piece, destination, promotion)
+            board.invalidate_cache_after_move()
+            plies += 1
+    except Exception as e:
+        error = f'{e.__class__.__name__}: {e}'
+
+    if error is None:
+        error_san = None
+
+    return ReplayResult(
+            game=game,
+            headers=parser.headers,
+            status=board.get_board_status(board.turn),
+            plies=plies,
+            error_san=error_san,
+            error=error,
+            seconds=time.perf_counter() - start,
+    )
+
+
+# Each worker process opens the index once, and keeps it for every chunk of games it's handed
+_worker_index: tp.Optional[PgnIndex] = None
+
+
+def _init_worker(pgn_fp: str, index_fp: str) -> None:
+    global _worker_index
+    _worker_index = PgnIndex(pgn_fp, index_fp)
+
+
+def _replay_task(first: int, last: int) -> tp.List[ReplayResult]:
+    '''Runs in a worker process. Games travel as their numbers, the worker reads them from the PGN itself'''
+    return [replay_game(Parser.from_index(_worker_index, n), n) for n in range(first, last)]
+
+
+def replay_pgn(pgn_fp: str, jobs: tp.Optional[int] = None, chunk_size: int = 64,
+               index_fp: tp.Optional[str] = None) -> tp.Generator[ReplayResult, None, None]:
+    '''
+    Replays every game of a PGN file, yielding the results in game order.
+
+    The file is indexed first (see PgnIndex.open), then the games are handed to `jobs` worker processes in chunks
+    of `chunk_size` consecutive games. With a single job the games are replayed in this process instead.
+    '''
+    with PgnIndex.open(pgn_fp, index_fp) as index:
+        count = len(index)
+        if jobs == 1:
+            for n in range(count):
+                yield replay_game(Parser.from_index(index, n), n)
+            return
+
+        index_fp = index.index_fp
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(pgn_fp, index_fp)) as executor:
+        futures = [executor.submit(_replay_task, first, min(first + chunk_size, count))
+                   for first in range(0, count, chunk_size)]
+        for future in futures:
+            yield from future.result()
+
+
+def main(argv: tp.Optional[tp.List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Replay and validate every game of a PGN file')
+    parser.add_argument('pgn', help='PGN file, indexed next to itself on first use')
+    parser.add_argument('--jobs', type=int, default=0, help='worker processes, 0 for one per CPU (default: 0)')
+    parser.add_argument('--chunk-size', type=int, default=64, help='games handed to a worker at a time (default: 64)')
+    parser.add_argument('--errors', action='store_true', help='list every game that failed to replay')
+    args = parser.parse_args(argv)
+    jobs = args.jobs or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    games = plies = failed = 0
+    for result in replay_pgn(args.pgn, jobs, args.chunk_size):
+        games += 1
+        plies += result.plies
+        if not result.ok:
+            failed += 1
+            if args.errors:
+                print(f'game {result.game}: {result.error_san!r} after {result.plies} plies, {result.error}')
+    elapsed = time.perf_counter() - start
+
+    per_minute = games / elapsed * 60 if elapsed > 0 else float('inf')
+    print(f'{games} games  {plies} plies  {failed} failed  {elapsed:.3f}s  {per_minute:.0f} games/min')
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
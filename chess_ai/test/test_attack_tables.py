@@ -0,0 +1,58 @@
+from pytest import main
+
+from chess_ai.core.Mechanics.attack_tables import (KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, LINE,
+        rook_attacks, bishop_attacks, queen_attacks)
+from chess_ai.core.Mechanics.bitboard import BB_SQUARES, EMPTY, popcount, square_index
+from chess_ai.core.Mechanics.color import Color
+
+
+def squares(*names):
+    bb = EMPTY
+    for name in names:
+        bb |= BB_SQUARES[square_index(int(name[1]) - 1, ord(name[0]) - ord('A'))]
+    return bb
+
+
+def sq(name):
+    return square_index(int(name[1]) - 1, ord(name[0]) - ord('A'))
+
+
+def test_leaper_tables():
+    assert KNIGHT_ATTACKS[sq('A1')] == squares('B3', 'C2')
+    assert popcount(KNIGHT_ATTACKS[sq('D4')]) == 8
+    assert KING_ATTACKS[sq('H8')] == squares('G8', 'G7', 'H7')
+    assert popcount(KING_ATTACKS[sq('E4')]) == 8
+
+    assert PAWN_ATTACKS[Color.White][sq('E4')] == squares('D5', 'F5')
+    assert PAWN_ATTACKS[Color.Black][sq('E4')] == squares('D3', 'F3')
+    assert PAWN_ATTACKS[Color.White][sq('A2')] == squares('B3')
+    assert PAWN_ATTACKS[Color.White][sq('C8')] == EMPTY
+
+
+def test_sliding_attacks_stop_at_blockers():
+    occupied = squares('D6', 'B4', 'F2')
+
+    assert rook_attacks(sq('D4'), occupied) == squares(
+            'D5', 'D6', 'D3', 'D2', 'D1', 'C4', 'B4', 'E4', 'F4', 'G4', 'H4')
+    assert bishop_attacks(sq('D4'), occupied) == squares(
+            'C5', 'B6', 'A7', 'E5', 'F6', 'G7', 'H8', 'C3', 'B2', 'A1', 'E3', 'F2')
+    assert queen_attacks(sq('D4'), occupied) == rook_attacks(sq('D4'), occupied) | bishop_attacks(sq('D4'), occupied)
+
+    # A blocker on the square itself doesn't matter
+    assert rook_attacks(sq('A1'), squares('A1')) == rook_attacks(sq('A1'), EMPTY)
+    assert popcount(rook_attacks(sq('A1'), EMPTY)) == 14
+
+
+def test_between_and_line():
+    assert BETWEEN[sq('A1')][sq('D4')] == squares('B2', 'C3')
+    assert BETWEEN[sq('D4')][sq('A1')] == squares('B2', 'C3')
+    assert BETWEEN[sq('E1')][sq('E8')] == squares('E2', 'E3', 'E4', 'E5', 'E6', 'E7')
+    assert BETWEEN[sq('E1')][sq('F1')] == EMPTY
+    assert BETWEEN[sq('A1')][sq('B3')] == EMPTY
+
+    assert LINE[sq('B2')][sq('C3')] == squares('A1', 'B2', 'C3', 'D4', 'E5', 'F6', 'G7', 'H8')
+    assert LINE[sq('A1')][sq('B3')] == EMPTY
+
+
+if __name__ == '__main__':
+    main()
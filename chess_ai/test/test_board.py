@@ -0,0 +1,412 @@
+from pytest import main, raises
+
+from chess_ai.core.Game.board import Board, START_FEN
+from chess_ai.core.Mechanics.bitboard import BB_SQUARES, popcount, square_index
+from chess_ai.core.Mechanics.color import Color
+from chess_ai.core.Mechanics.move import BoardMove, IllegalMove, AmbiguousMove
+from chess_ai.core.Mechanics.point import Point
+from chess_ai.core.Pieces.piece import PieceType
+from chess_ai.core.Utils.pgn_parser import Parser
+
+
+def assert_bitboards_match_squares(b):
+    for color in Color:
+        occupancy = 0
+        for piece_type in PieceType:
+            bb = b.bitboard(color, piece_type)
+            occupancy |= bb
+            for row in range(8):
+                for col in range(8):
+                    piece = b[row, col]
+                    expected = (piece is not None and piece.color == color and piece.piece_type == piece_type)
+                    assert bool(bb & BB_SQUARES[square_index(row, col)]) == expected
+        assert occupancy == b.occupancy(color)
+
+
+def test_initial_bitboards():
+    b = Board()
+    assert_bitboards_match_squares(b)
+
+    assert 16 == popcount(b.occupancy(Color.White))
+    assert 16 == popcount(b.occupancy(Color.Black))
+    assert 0xFFFF00000000FFFF == b.occupied
+
+    assert b.bitboard(Color.White, PieceType.King) == BB_SQUARES[square_index(0, 4)]
+    assert b.bitboard(Color.Black, PieceType.Pawn) == 0xFF << 48
+
+
+def test_getitem_keys():
+    b = Board()
+    assert b[0, 4] is b[Point(0, 4)] is b['E1'] is b.get_king(Color.White)
+    assert b[4, 4] is None
+    assert b[-1, 0] is None
+    assert b[0, 8] is None
+
+
+def test_perform_move_updates_bitboards():
+    b = Board()
+
+    b.perform_move(b['E2'], Point.from_str('E4'))
+    b.perform_move(b['D7'], Point.from_str('D5'))
+    b.perform_move(b['E4'], Point.from_str('D5'))
+    assert_bitboards_match_squares(b)
+    assert 15 == popcount(b.occupancy(Color.Black))
+
+    b.remove_piece('D5')
+    assert_bitboards_match_squares(b)
+    assert 15 == popcount(b.occupancy(Color.White))
+
+
+def snapshot(b):
+    squares = []
+    for row in range(8):
+        for col in range(8):
+            piece = b[row, col]
+            if piece is None:
+                squares.append(None)
+            else:
+                squares.append((id(piece), piece.pos, piece.is_first_move))
+
+    # Piece lists have to come back in the same order, not just with the same contents
+    pieces = {(color, piece_type): tuple(b.get_pieces(color, piece_type)) for color in Color for piece_type in PieceType}
+    teams = {color: tuple(b.get_team(color)) for color in Color}
+    bitboards = {(color, piece_type): b.bitboard(color, piece_type) for color in Color for piece_type in PieceType}
+
+    return squares, pieces, teams, bitboards, b._enpassant_location.value
+
+
+def push_and_pop(b, start, end, promotion=None):
+    before = snapshot(b)
+    move = BoardMove(Point.from_str(start), Point.from_str(end), promotion)
+
+    b.push(move)
+    assert snapshot(b) != before
+    assert_bitboards_match_squares(b)
+
+    assert b.pop() == move
+    assert snapshot(b) == before
+
+    b.push(move)
+
+
+def test_push_pop_castle():
+    b = Board()
+    b.remove_piece('F1')
+    b.remove_piece('G1')
+
+    push_and_pop(b, 'E1', 'G1')
+    assert b['F1'].piece_type == PieceType.Rook
+    assert b['G1'].piece_type == PieceType.King
+    assert b['H1'] is None
+    assert not b['F1'].is_first_move
+
+
+def test_push_pop_en_passant():
+    b = Board()
+    push_and_pop(b, 'E2', 'E4')
+    assert b._enpassant_location.value == Point.from_str('E3')
+
+    push_and_pop(b, 'A7', 'A6')
+    push_and_pop(b, 'E4', 'E5')
+    push_and_pop(b, 'D7', 'D5')
+    push_and_pop(b, 'E5', 'D6')
+
+    assert b['D5'] is None
+    assert b['D6'].piece_type == PieceType.Pawn
+    assert 15 == popcount(b.occupancy(Color.Black))
+
+
+def test_push_pop_promotion():
+    b = Board()
+    b.remove_piece('A7')
+    b.remove_piece('A8')
+
+    for start, end in (('A2', 'A4'), ('A4', 'A5'), ('A5', 'A6'), ('A6', 'A7')):
+        push_and_pop(b, start, end)
+
+    push_and_pop(b, 'A7', 'B8', PieceType.Knight)
+    assert b['B8'].piece_type == PieceType.Knight
+    assert b['B8'].color == Color.White
+    assert 7 == popcount(b.bitboard(Color.White, PieceType.Pawn))
+    assert 3 == len(b.get_pieces(Color.White, PieceType.Knight))
+    assert 16 == len(b.get_team(Color.White))
+    assert 13 == len(b.get_team(Color.Black))
+
+
+def test_nested_push_pop():
+    b = Board()
+    before = snapshot(b)
+
+    moves = [('E2', 'E4'), ('D7', 'D5'), ('E4', 'D5'), ('D8', 'D5'), ('B1', 'C3')]
+    for start, end in moves:
+        b.push(BoardMove(Point.from_str(start), Point.from_str(end)))
+
+    # Legality checks push and pop on top of the existing stack
+    for piece in b.get_team(Color.Black):
+        piece.get_all_valid_moves()
+
+    for _ in moves:
+        b.pop()
+
+    assert snapshot(b) == before
+
+
+def push_str(b, start, end):
+    b.push(BoardMove(Point.from_str(start), Point.from_str(end)))
+
+
+def test_zobrist_transposition():
+    b = Board()
+    initial = b.zobrist_key
+    assert initial == b._compute_zobrist_key()
+
+    for start, end in (('G1', 'F3'), ('G8', 'F6'), ('F3', 'G1'), ('F6', 'G8')):
+        push_str(b, start, end)
+        assert b.zobrist_key == b._compute_zobrist_key()
+        assert b.zobrist_key != initial or start == 'F6'
+
+    assert b.zobrist_key == initial
+
+    for _ in range(4):
+        b.pop()
+        assert b.zobrist_key == b._compute_zobrist_key()
+
+
+def test_zobrist_side_castling_and_en_passant():
+    b = Board()
+    push_str(b, 'E2', 'E4')
+
+    # Black to move is hashed differently from white to move
+    assert b.zobrist_key != Board().zobrist_key
+
+    # Losing castling rights changes the key even when placement transposes back
+    a = Board()
+    for start, end in (('E2', 'E4'), ('E7', 'E5'), ('E1', 'E2'), ('E8', 'E7'), ('E2', 'E1'), ('E7', 'E8')):
+        push_str(a, start, end)
+    c = Board()
+    for start, end in (('E2', 'E4'), ('E7', 'E5'), ('G1', 'F3'), ('G8', 'F6'), ('F3', 'G1'), ('F6', 'G8')):
+        push_str(c, start, end)
+    assert a.zobrist_key != c.zobrist_key
+    assert a._compute_zobrist_key() == a.zobrist_key
+
+    # The en passant square only counts when it can actually be captured onto
+    d = Board()
+    for start, end in (('E2', 'E4'), ('A7', 'A6'), ('E4', 'E5'), ('D7', 'D5')):
+        push_str(d, start, end)
+    assert d._en_passant_file() == 3
+    assert d.zobrist_key == d._compute_zobrist_key()
+
+    e = Board()
+    push_str(e, 'H2', 'H4')
+    assert e._en_passant_file() == -1
+
+
+def test_zobrist_incremental_over_game():
+    b = Board()
+
+    # Ruy Lopez into both sides castling, a capture exchange and an en passant capture
+    moves = [('E2', 'E4'), ('E7', 'E5'), ('G1', 'F3'), ('B8', 'C6'), ('F1', 'B5'), ('A7', 'A6'),
+             ('B5', 'A4'), ('G8', 'F6'), ('E1', 'G1'), ('F8', 'E7'), ('F1', 'E1'), ('B7', 'B5'),
+             ('A4', 'B3'), ('D7', 'D6'), ('C2', 'C3'), ('E8', 'G8'), ('D2', 'D4'), ('E5', 'D4'),
+             ('C3', 'D4'), ('B5', 'B4'), ('A2', 'A4'), ('B4', 'A3'), ('B1', 'A3'), ('C8', 'G4')]
+
+    keys = [b.zobrist_key]
+    for start, end in moves:
+        push_str(b, start, end)
+        assert b.zobrist_key == b._compute_zobrist_key()
+        keys.append(b.zobrist_key)
+
+    assert b['A4'] is None and b['A3'].piece_type == PieceType.Knight
+
+    while len(keys) > 1:
+        keys.pop()
+        b.pop()
+        assert b.zobrist_key == keys[-1]
+
+
+def assert_attack_maps_match(b):
+    for index in range(64):
+        for color in Color:
+            expected = b.attackers_of(index, color, b.occupied)
+            assert b.attackers_of(index, color) == expected
+            assert b.attack_count(index, color) == popcount(expected)
+
+
+def test_attack_maps():
+    b = Board()
+    assert_attack_maps_match(b)
+    assert b.attack_count(square_index(2, 4), Color.White) == 2
+    assert not b.is_attacked(square_index(3, 4), Color.White)
+
+    # Captures, castling and a check, comparing the maps against a from scratch lookup on the way in and out
+    moves = [('E2', 'E4'), ('E7', 'E5'), ('G1', 'F3'), ('B8', 'C6'), ('F1', 'C4'), ('F8', 'C5'),
+             ('E1', 'G1'), ('D7', 'D6'), ('F3', 'E5'), ('D6', 'E5'), ('D1', 'H5'), ('A7', 'A5'),
+             ('H5', 'F7')]
+    for start, end in moves:
+        push_str(b, start, end)
+        assert_attack_maps_match(b)
+
+    assert b.get_king(Color.Black).in_check
+    assert b.attack_count(square_index(7, 4), Color.White) == 1
+
+    for _ in moves:
+        b.pop()
+        assert_attack_maps_match(b)
+
+    # Lifting a piece opens up the rays passing through its square
+    assert not b.is_attacked(square_index(5, 7), Color.White)
+    b.remove_piece('D2')
+    assert_attack_maps_match(b)
+    assert b.is_attacked(square_index(5, 7), Color.White)
+
+
+def test_from_fen():
+    b = Board.from_fen('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1')
+    assert_bitboards_match_squares(b)
+    assert_attack_maps_match(b)
+
+    assert b.turn == Color.White
+    assert b['G1'].piece_type == PieceType.King and not b['G1'].is_first_move
+    assert b['E8'].is_first_move and b['A8'].is_first_move and b['H8'].is_first_move
+    assert b['D2'].is_first_move and not b['A7'].is_first_move
+    assert len(b.get_team(Color.White)) == 16
+    assert b.zobrist_key == b._compute_zobrist_key()
+
+    start = Board.from_fen(START_FEN)
+    assert start.zobrist_key == Board().zobrist_key
+    assert [(p.pos, p.piece_type) for p in start.get_team(Color.Black)] == \
+            [(p.pos, p.piece_type) for p in Board().get_team(Color.Black)]
+
+    with raises(ValueError):
+        Board.from_fen('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1')
+    with raises(ValueError):
+        Board.from_fen('rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1')
+
+
+def test_to_fen():
+    b = Board()
+    assert b.to_fen() == START_FEN
+
+    fens = ['rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1',
+            'rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2',
+            'rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2']
+    for (start, end), fen in zip((('E2', 'E4'), ('E7', 'E5'), ('G1', 'F3')), fens):
+        push_str(b, start, end)
+        assert b.to_fen() == fen
+        assert Board.from_fen(fen).to_fen() == fen
+        assert Board.from_fen(fen).zobrist_key == b.zobrist_key
+
+    for fen in reversed([START_FEN] + fens[:-1]):
+        b.pop()
+        assert b.to_fen() == fen
+
+    # Castling rights go once the king or a rook moves
+    fen = 'r3k2r/8/8/8/8/8/8/R3K2R w Kq - 12 40'
+    assert Board.from_fen(fen).to_fen() == fen
+
+
+def resolve(b, san, color=Color.White):
+    piece, to, _ = b.parse_points_from_move(Parser.parse_move(san, color))
+    return piece.pos.to_str(), to.to_str()
+
+
+def test_san_resolution():
+    # Pawn captures take the file they come from
+    b = Board.from_fen('4k3/8/8/1p6/P1P5/8/8/4K3 w - - 0 1')
+    assert ('A4', 'B5') == resolve(b, 'axb5')
+    assert ('C4', 'B5') == resolve(b, 'cxb5')
+    assert ('A4', 'A5') == resolve(b, 'a5')
+    with raises(IllegalMove):
+        resolve(b, 'axb6')
+
+    # Two knights reach d2, unless one of them is pinned
+    b = Board.from_fen('4k3/8/8/8/8/8/8/1N2KN2 w - - 0 1')
+    with raises(AmbiguousMove):
+        resolve(b, 'Nd2')
+    assert ('B1', 'D2') == resolve(b, 'Nbd2')
+    assert ('F1', 'D2') == resolve(b, 'Nfd2')
+
+    b = Board.from_fen('4k3/8/8/8/8/8/8/1N2KN1r w - - 0 1')
+    assert ('B1', 'D2') == resolve(b, 'Nd2')
+    with raises(IllegalMove):
+        resolve(b, 'Ng3')
+
+    # Rank hints, and only moves answering a check are legal
+    b = Board.from_fen('4k3/8/8/R7/8/8/8/R3K3 w - - 0 1')
+    with raises(AmbiguousMove):
+        resolve(b, 'Ra3')
+    assert ('A5', 'A3') == resolve(b, 'R5a3')
+    assert ('A1', 'A3') == resolve(b, 'R1a3')
+
+    b = Board.from_fen('4k3/8/8/5R2/8/8/8/R3K2r w - - 0 1')
+    assert ('F5', 'F1') == resolve(b, 'Rf1')
+    with raises(IllegalMove):
+        resolve(b, 'Ra3')
+
+    b = Board()
+    for san in ('e5', 'Ke2', 'Nd2', 'Bb2'):
+        with raises(IllegalMove):
+            resolve(b, san)
+
+
+def test_san_castling():
+    b = Board.from_fen('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+    assert ('E1', 'C1') == resolve(b, 'O-O-O')
+    assert ('E1', 'G1') == resolve(b, 'O-O')
+    assert ('E8', 'C8') == resolve(b, 'O-O-O', Color.Black)
+
+    piece, to, _ = b.parse_points_from_move(Parser.parse_move('O-O-O', Color.White))
+    b.perform_move(piece, to)
+    assert PieceType.King == b['C1'].piece_type
+    assert PieceType.Rook == b['D1'].piece_type
+
+    # No castling out of check
+    b = Board.from_fen('r3k2r/8/8/8/8/8/8/R3K1rR w KQkq - 0 1')
+    with raises(IllegalMove):
+        resolve(b, 'O-O-O')
+
+
+def test_scores():
+    b = Board()
+    # Symmetric, the side to move doesn't count
+    assert b.white_score == b.black_score > 0
+    assert Board.from_fen(START_FEN).white_score == b.white_score
+
+    # Ruy Lopez into both sides castling, capture exchanges and an en passant capture
+    moves = [('E2', 'E4'), ('E7', 'E5'), ('G1', 'F3'), ('B8', 'C6'), ('F1', 'B5'), ('A7', 'A6'),
+             ('B5', 'A4'), ('G8', 'F6'), ('E1', 'G1'), ('F8', 'E7'), ('F1', 'E1'), ('B7', 'B5'),
+             ('A4', 'B3'), ('D7', 'D6'), ('C2', 'C3'), ('E8', 'G8'), ('D2', 'D4'), ('E5', 'D4'),
+             ('C3', 'D4'), ('B5', 'B4'), ('A2', 'A4'), ('B4', 'A3'), ('B1', 'A3'), ('C8', 'G4'),
+             ('G4', 'F3'), ('G2', 'F3'), ('C6', 'D4'), ('D1', 'D4')]
+    assert_scores_incremental(b, moves)
+
+    # A promotion, the pawn gives way to a queen
+    b = Board.from_fen('4k3/1P6/8/8/8/8/8/4K3 w - - 0 1')
+    (pawn_up, _), (queen_up, _) = assert_scores_incremental(b, [('B7', 'B8')])
+    assert queen_up - pawn_up > 600
+
+
+def assert_scores_incremental(b, moves):
+    '''Plays the moves and takes them back, checking the scores along the way. Returns the scores of each position'''
+    scores = [(b.white_score, b.black_score)]
+    for start, end in moves:
+        push_str(b, start, end)
+        # Brought up to date move by move, the scores match those of the position set up from scratch
+        fresh = Board.from_fen(b.to_fen())
+        assert (b.white_score, b.black_score) == (fresh.white_score, fresh.black_score)
+        scores.append((b.white_score, b.black_score))
+
+    for expected in reversed(scores[:-1]):
+        b.pop()
+        assert (b.white_score, b.black_score) == expected
+    return scores
+
+
+def test_scores_mirrored():
+    b = Board.from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+    mirrored = Board.from_fen('r3k2r/pppbbppp/2n2q1P/1P2p3/3pn3/BN2PNP1/P1PPQPB1/R3K2R b KQkq - 0 1')
+    assert (b.white_score, b.black_score) == (mirrored.black_score, mirrored.white_score)
+
+
+if __name__ == '__main__':
+    main()
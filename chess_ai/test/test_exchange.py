@@ -0,0 +1,55 @@
+from pytest import main, mark
+
+from chess_ai.core.Game.board import Board
+from chess_ai.core.Search import search
+from chess_ai.core.Search.exchange import see
+from chess_ai.core.perft import move_str, parse_move_str
+
+
+@mark.parametrize('fen, move, expected', [
+    # Undefended, and defended by a pawn
+    ('4k3/8/8/3p4/8/8/8/3RK3 w - - 0 1', 'd1d5', 100),
+    ('4k3/8/2p5/3n4/4P3/8/8/4K3 w - - 0 1', 'e4d5', 220),
+    ('4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1', 'd1d5', -800),
+    # The rook behind the first one joins in once the first one has taken
+    ('3rk3/8/8/3p4/8/8/3R4/3RK3 w - - 0 1', 'd2d5', 100),
+    ('3rk3/8/8/3p4/8/8/8/3RK3 w - - 0 1', 'd1d5', -400),
+    # The king can only take back a piece nothing else defends
+    ('8/8/4k3/3p4/8/1B6/8/3RK3 w - - 0 1', 'd1d5', 100),
+    ('8/8/4k3/3p4/8/8/8/3RK3 w - - 0 1', 'd1d5', -400),
+    # En passant, and promotions
+    ('4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1', 'e5d6', 100),
+    ('4k3/1P6/8/8/8/8/8/4K3 w - - 0 1', 'b7b8q', 800),
+    ('1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1', 'a7b8q', 1300),
+    ('1q2k3/2P5/8/8/8/8/8/4K3 w - - 0 1', 'c7c8q', -100),
+])
+def test_see(fen, move, expected):
+    board = Board.from_fen(fen)
+    key = board.zobrist_key
+
+    assert see(board, parse_move_str(move)) == expected
+    assert board.zobrist_key == key
+
+
+def test_quiescence_sees_recapture():
+    # Without looking past the horizon, taking the defended pawn looks like winning one
+    board = Board.from_fen('4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1')
+    result = search.search(board, 1)
+
+    # The queen stays up most of her value, rather than being traded for a pawn
+    assert move_str(result.best_move) != 'd1d5'
+    assert 600 < result.score < 1000
+
+
+def test_quiescence_restores_board():
+    board = Board.from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+    fen = board.to_fen()
+    searcher = search.Searcher(board)
+    searcher.search(2)
+
+    assert 0 < searcher.quiescence_nodes < searcher.nodes
+    assert board.to_fen() == fen
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,13 @@
 import os
 from pytest import main, mark
 
-from chess_ai.core.Game.game import Game
+from chess_ai.core.Game.game import Game, GamePolicy, GameResult, CompetitiveRulesetEndings
+from chess_ai.core.Mechanics.color import Color
+from chess_ai.core.Mechanics.point import Point
 from chess_ai.core.Mechanics.status import Status
+from chess_ai.core.Pieces.piece import PieceType
 from chess_ai.core.Utils.pgn_parser import Parser
+from chess_ai.core.Utils.reference import Ref
 from chess_ai.test import get_input
 
 
@@ -54,6 +58,125 @@ def test_game_from_parser_b():
     assert game_status == Status.Checkmate
     assert competitive_ending.value is None
 
+def test_game_from_parser_length8848_5():
+    game = Game()
+    parser = Parser.from_pgn(get_input.get('length8848.5.pgn'))
+
+    # Mate lands on the 150th ply without progress, which takes precedence over the 75 move rule
+    game_status, competitive_ending = game.start_game(parser)
+
+    assert game_status == Status.Checkmate
+    assert competitive_ending.value is None
+    assert game.board.halfmove_clock == 150
+
+
+def play(game, moves):
+    status = Ref(Status.InProgress)
+    for start, end in moves:
+        game.board.perform_move(game.board[start], Point.from_str(end))
+        game._reset_after_turn(status)
+
+
+def test_repetitions():
+    game = Game()
+    knight_shuffle = [('G1', 'F3'), ('G8', 'F6'), ('F3', 'G1'), ('F6', 'G8')]
+
+    play(game, [('E2', 'E4'), ('E7', 'E5')])
+    assert game.repetitions[game.board.zobrist_key] == 1
+    assert len(game.repetitions) == 1
+
+    play(game, knight_shuffle * 2)
+    assert game.repetitions[game.board.zobrist_key] == 3
+
+    game.threefold_repetitions_forfeited = True
+    assert game.check_repetitions() is None
+
+    play(game, knight_shuffle)
+    assert game.check_repetitions() is None
+
+    play(game, knight_shuffle)
+    assert game.check_repetitions() == CompetitiveRulesetEndings.FivefoldRepeat
+
+    # A pawn move is irreversible, so earlier positions are forgotten
+    play(game, [('D2', 'D4')])
+    assert len(game.repetitions) == 1
+    assert game.check_repetitions() is None
+
+
+def test_no_progress():
+    game = Game()
+    knight_shuffle = [('G1', 'F3'), ('G8', 'F6'), ('F3', 'G1'), ('F6', 'G8')]
+
+    play(game, [('E2', 'E4')] + knight_shuffle * 25)
+    assert game.board.halfmove_clock == 100
+
+    game.fifty_moves_no_progress_forfeited = True
+    assert game.check_no_progress() is None
+
+    play(game, knight_shuffle * 12 + knight_shuffle[:2])
+    assert game.check_no_progress() == CompetitiveRulesetEndings.SeventyFiveNoProgress
+
+
+class ScriptedPolicy(GamePolicy):
+    def __init__(self, moves, claim_draws=False, promotion=PieceType.Queen):
+        self.moves = list(moves)
+        self.claim_draws = claim_draws
+        self.promotion = promotion
+        self.claims = []
+
+    def choose_move(self, game):
+        if not self.moves:
+            return None
+        start, end = self.moves.pop(0)
+        return Point.from_str(start), Point.from_str(end)
+
+    def choose_promotion(self, game, piece, to):
+        return self.promotion
+
+    def claim_draw(self, game, ending):
+        self.claims.append(ending)
+        return self.claim_draws
+
+
+def test_headless_replay(capsys):
+    game = Game(GamePolicy())
+    result = game.play(Parser.from_pgn(get_input.get('length8848.5.pgn')))
+
+    assert GameResult(status=Status.Checkmate, ending=None, winner=Color.White, plies=17697, finished=True) == result
+    assert '' == capsys.readouterr().out
+
+
+def test_headless_policy_moves(capsys):
+    knight_shuffle = [('G1', 'F3'), ('G8', 'F6'), ('F3', 'G1'), ('F6', 'G8')]
+
+    # The policy runs out of moves before the game ends
+    result = Game(ScriptedPolicy(knight_shuffle[:3])).play([('E2', 'E4')])
+    assert GameResult(status=Status.InProgress, ending=None, winner=None, plies=4, finished=False) == result
+
+    # Draw claims come from the policy too
+    policy = ScriptedPolicy(knight_shuffle * 2, claim_draws=True)
+    result = Game(policy).play()
+    assert CompetitiveRulesetEndings.ThreefoldRepeat == result.ending
+    assert result.finished and 8 == result.plies
+    assert [CompetitiveRulesetEndings.ThreefoldRepeat] == policy.claims
+
+    policy = ScriptedPolicy(knight_shuffle * 4)
+    result = Game(policy).play()
+    assert CompetitiveRulesetEndings.FivefoldRepeat == result.ending
+    assert [CompetitiveRulesetEndings.ThreefoldRepeat] == policy.claims
+
+    assert '' == capsys.readouterr().out
+
+
+def test_headless_promotion():
+    moves = [('B2', 'B4'), ('A7', 'A5'), ('B4', 'A5'), ('B7', 'B6'), ('A5', 'B6'), ('C8', 'A6'),
+             ('B6', 'B7'), ('B8', 'C6'), ('B7', 'B8')]
+    game = Game(ScriptedPolicy(moves, promotion=PieceType.Knight))
+    result = game.play()
+
+    assert 9 == result.plies
+    assert PieceType.Knight == game.board['B8'].piece_type
+
 
 if __name__ == '__main__':
     #main()
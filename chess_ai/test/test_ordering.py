@@ -0,0 +1,84 @@
+from pytest import main
+
+from chess_ai.core.Game.board import Board
+from chess_ai.core.Search.ordering import MoveOrderer
+from chess_ai.core.Search.search import Searcher
+from chess_ai.core.Search.transposition import TranspositionTable
+from chess_ai.core.perft import move_str, parse_move_str
+
+
+def ordered(board: Board, orderer: MoveOrderer, ply: int = 0, hash_move=None):
+    board.invalidate_cache()
+    return [move_str(move) for move in orderer.order(board, board.legal_moves(), ply, hash_move)]
+
+
+def test_mvv_lva():
+    # The queen on d5 can be taken by the pawn, knight and rook, the pawn on b5 by the queen & pawn
+    board = Board.from_fen('4k3/8/8/1p1q4/2P5/4N3/8/3RK3 w - - 0 1')
+    moves = ordered(board, MoveOrderer())
+
+    assert moves[:4] == ['c4d5', 'e3d5', 'd1d5', 'c4b5']
+
+
+def test_losing_captures_last():
+    # The pawn on d5 is defended, taking it with the queen loses her
+    board = Board.from_fen('4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1')
+    assert ordered(board, MoveOrderer())[-1] == 'd1d5'
+
+
+def test_promotions_and_en_passant():
+    board = Board.from_fen('4k3/1P6/8/3pP3/8/8/8/4K3 w - d6 0 1')
+    moves = ordered(board, MoveOrderer())
+
+    assert moves[:2] == ['b7b8q', 'b7b8r']
+    assert set(moves[2:5]) == {'b7b8b', 'b7b8n', 'e5d6'}
+    assert moves.index('e5d6') < moves.index('e5e6')
+
+
+def test_hash_move_and_killers():
+    board = Board.from_fen('4k3/8/8/1p1q4/2P5/4N3/8/3RK3 w - - 0 1')
+    orderer = MoveOrderer()
+    hash_move = parse_move_str('e1f2')
+
+    orderer.cutoff(board, parse_move_str('d1a1'), 3, 2, 1)
+    orderer.cutoff(board, parse_move_str('d1b1'), 3, 2, 1)
+    # Captures aren't killers
+    orderer.cutoff(board, parse_move_str('c4d5'), 3, 2, 0)
+
+    moves = ordered(board, orderer, 3, hash_move)
+    assert moves[0] == 'e1f2'
+    assert moves[5:7] == ['d1b1', 'd1a1']
+    assert orderer.killers[3] == [parse_move_str('d1b1'), parse_move_str('d1a1')]
+
+    # Other plies have killers of their own, but the history carries over
+    moves = ordered(board, orderer, 4)
+    assert set(moves[4:6]) == {'d1b1', 'd1a1'}
+
+    assert orderer.cutoffs == 3
+    assert orderer.first_move_cutoffs == 1
+
+
+def test_new_search():
+    board = Board.from_fen('4k3/8/8/1p1q4/2P5/4N3/8/3RK3 w - - 0 1')
+    orderer = MoveOrderer()
+    for _ in range(3):
+        orderer.cutoff(board, parse_move_str('d1a1'), 0, 2, 0)
+    index = parse_move_str('d1a1').start.index << 6 | parse_move_str('d1a1').end.index
+
+    orderer.new_search()
+    assert orderer.killers[0] == [None, None]
+    assert orderer.history[board.turn][index] == 6
+    assert orderer.cutoffs == 0
+
+
+def test_search_statistics():
+    board = Board.from_fen('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10')
+    searcher = Searcher(board, TranspositionTable(1))
+    searcher.search(3)
+
+    assert searcher.ordering.cutoffs > 0
+    assert searcher.ordering.first_move_cutoff_rate > 0.8
+
+
+if __name__ == '__main__':
+    main()
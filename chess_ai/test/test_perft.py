@@ -0,0 +1,61 @@
+from pytest import main, mark
+
+from chess_ai.core import perft
+from chess_ai.core.Game.board import Board
+
+
+@mark.parametrize('position', perft.STANDARD_POSITIONS, ids=lambda position: position.name)
+def test_standard_positions(position):
+    board = Board.from_fen(position.fen)
+    key = board.zobrist_key
+
+    for depth in (1, 2):
+        assert perft.perft(board, depth) == position.nodes[depth - 1]
+
+    # Perft plays everything back out
+    assert board.zobrist_key == key == board._compute_zobrist_key()
+
+
+def test_start_position_depth_3():
+    assert perft.perft(Board.from_fen(perft.STANDARD_POSITIONS[0].fen), 3) == 8902
+
+
+def test_divide():
+    board = Board.from_fen(perft.STANDARD_POSITIONS[1].fen)
+    counts = perft.divide(board, 2)
+
+    assert len(counts) == 48
+    assert sum(counts.values()) == 2039
+    assert counts['e1g1'] == 43
+    assert counts['e1c1'] == 43
+
+
+def test_parallel_divide():
+    position = perft.STANDARD_POSITIONS[1]
+    expected = perft.divide(Board.from_fen(position.fen), 2)
+
+    assert perft.parallel_divide(position.fen, 2, jobs=2) == expected
+    assert perft.parallel_divide(position.fen, 2, jobs=2, split_plies=2) == expected
+    assert perft.parallel_divide(position.fen, 2, jobs=2, split_plies=2, cached=True) == expected
+
+
+def test_perft_cached():
+    for position in perft.STANDARD_POSITIONS:
+        board = Board.from_fen(position.fen)
+        table = {}
+        assert perft.perft_cached(board, 3, table) == position.nodes[2]
+        assert table[(board.zobrist_key, 3)] == position.nodes[2]
+
+
+def test_parse_move_str():
+    for s in ('e2e4', 'a7a8q', 'h2h1n'):
+        assert perft.move_str(perft.parse_move_str(s)) == s
+
+
+def test_main(capsys):
+    assert perft.main(['--depth', '2', '--position', 'position3']) == 0
+    assert 'nodes        191' in capsys.readouterr().out
+
+
+if __name__ == '__main__':
+    main()
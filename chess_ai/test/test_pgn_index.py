@@ -0,0 +1,73 @@
+import os
+import shutil
+from pytest import main, raises
+
+from chess_ai.core.Utils.pgn_index import PgnIndex
+from chess_ai.core.Utils.pgn_parser import Parser
+from chess_ai.test import get_input
+
+
+def copy_input(tmp_path, filename):
+    fp = str(tmp_path / filename)
+    shutil.copy(get_input.get(filename), fp)
+    return fp
+
+
+def test_build_and_open_games(tmp_path):
+    fp = copy_input(tmp_path, 'multi_game.pgn')
+    games = list(Parser.iter_pgn(fp))
+
+    with PgnIndex.build(fp) as index:
+        assert os.path.exists(fp + '.idx')
+        assert len(games) == len(index) == 4
+
+        # Games are opened in any order, straight from their offsets
+        for n in reversed(range(len(index))):
+            game = Parser.from_index(index, n)
+            assert games[n].moves == game.moves
+            assert games[n].headers == game.headers
+            assert {key: value for key, value in game.headers.items() if key in PgnIndex.KEY_HEADERS} == \
+                    index.headers(n)
+
+        offset, length = index.span(2)
+        assert index.read_game(2).startswith('[Event "Unfinished"]')
+        assert index.span(3)[0] == offset + length
+        assert index.span(3)[0] + index.span(3)[1] == os.path.getsize(fp)
+
+        with raises(IndexError):
+            index.span(4)
+
+
+def test_open_rebuilds_stale_index(tmp_path):
+    fp = copy_input(tmp_path, 'multi_game.pgn')
+    PgnIndex.build(fp).close()
+
+    with PgnIndex.open(fp) as index:
+        assert 4 == len(index)
+
+    with open(fp, 'a') as f:
+        f.write('\n[Event "Appended"]\n\n1. e4 *\n')
+    with PgnIndex.open(fp) as index:
+        assert 5 == len(index)
+        assert dict(Event='Appended') == index.headers(4)
+        assert [('e4', '')] == Parser.from_index(index, 4).moves
+
+    with open(fp + '.idx', 'wb') as f:
+        f.write(b'not an index')
+    with raises(ValueError):
+        PgnIndex(fp)
+    with PgnIndex.open(fp) as index:
+        assert 5 == len(index)
+
+
+def test_single_game_file(tmp_path):
+    fp = copy_input(tmp_path, 'fischer_spassky_1992.pgn')
+
+    with PgnIndex.open(fp, str(tmp_path / 'fischer.idx')) as index:
+        assert 1 == len(index)
+        assert 'Fischer, Robert J.' == index.headers(0)['White']
+        assert Parser.from_pgn(fp).moves == Parser.from_index(index, 0).moves
+
+
+if __name__ == '__main__':
+    main()
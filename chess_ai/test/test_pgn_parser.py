@@ -2,6 +2,7 @@ import os
 from collections import Counter
 from pytest import main
 
+from chess_ai.core.Mechanics.color import Color
 from chess_ai.core.Mechanics.point import Point
 from chess_ai.core.Mechanics.move import Move, Castle
 from chess_ai.core.Pieces.piece import PieceType
@@ -99,7 +100,7 @@ def test_parse_raphael_hiaves_2006():
     assert 2 == kingsides
     assert 0 == queensides
     assert dict(Queen=1) == upgrades
-    assert dict(A=2, C=1, F=2) == col_helpers
+    assert dict(A=2, B=1, C=2, D=1, E=2, F=2) == col_helpers
     assert {} == row_helpers
 
     assert dict(Pawn=6, Rook=3, Knight=5, Bishop=2, Queen=2, King=2) == white_pieces
@@ -134,7 +135,7 @@ def test_parse_fischer_spassky_1992():
     assert 2 == kingsides
     assert 0 == queensides
     assert {} == upgrades
-    assert dict(A=1, B=2) == col_helpers
+    assert dict(A=3, B=2, C=2, D=1, E=1, H=1) == col_helpers
     assert {} == row_helpers
 
     assert dict(Pawn=14, Rook=7, Knight=7, Bishop=8, Queen=3, King=4) == white_pieces
@@ -170,7 +171,7 @@ def test_parse_lucky_bardwick_1995():
     assert 0 == kingsides
     assert 1 == queensides
     assert {} == upgrades
-    assert dict(D=1, F=1) == col_helpers
+    assert dict(A=1, C=2, D=2, E=1, F=1, G=1) == col_helpers
     assert {} == row_helpers
 
     assert dict(Pawn=20, Rook=55, Knight=30, Bishop=3, Queen=8, King=27) == white_pieces
@@ -205,7 +206,7 @@ def test_parse_mecking_h_donner_1971():
     assert 2 == kingsides
     assert 0 == queensides
     assert {} == upgrades
-    assert dict(F=1) == col_helpers
+    assert dict(B=2, C=1, D=1, E=1, F=1) == col_helpers
     assert {} == row_helpers
 
     assert dict(Pawn=8, Rook=1, Knight=3, Bishop=2, Queen=2, King=1) == white_pieces
@@ -280,7 +281,7 @@ def test_parse_length8848_5():
     assert 0 == queensides
     assert dict(Queen=16) == upgrades
 
-    assert dict(A=593, B=762, C=885, D=914, E=750, F=803, G=781, H=536) == col_helpers
+    assert dict(A=594, B=763, C=886, D=915, E=751, F=804, G=782, H=537) == col_helpers
     assert {1: 173, 2: 158, 3: 198, 4: 183, 5: 142, 6: 126, 7: 95, 8: 81} == row_helpers
 
     assert dict(Pawn=48, Rook=962, Knight=1487, Bishop=716, Queen=4818, King=818) == white_pieces
@@ -292,6 +293,62 @@ def test_parse_length8848_5():
     assert 64 == len(black_destinations)
 
 
+def test_iter_pgn():
+    games = Parser.iter_pgn(get_input.get('multi_game.pgn'))
+    assert iter(games) is games
+
+    games = list(games)
+    assert 4 == len(games)
+
+    scholars_mate, gambit, unfinished, fools_mate = games
+    assert 'Club Championship +1' == scholars_mate.headers['Event']
+    assert 'Room 1-0' == scholars_mate.headers['Site']
+    assert 'A "The Rook" Player' == scholars_mate.headers['White']
+    assert [('e4', 'e5'), ('Qh5', 'Nc6'), ('Bc4', 'Nf6'), ('Qxf7', '')] == scholars_mate.moves
+
+    assert '1/2-1/2' == gambit.headers['Result']
+    assert [('d4', 'd5'), ('c4', 'dxc4'), ('e3', '')] == gambit.moves
+
+    assert 'Result' not in unfinished.headers
+    assert [('f3', 'e5'), ('g4', '')] == unfinished.moves
+
+    assert dict(Event='Fools mate', Result='0-1') == fools_mate.headers
+    assert [(white, black.rstrip('#')) for white, black in Parser.from_fools_mate().moves] == fools_mate.moves
+
+    # A single game file streams as that one game
+    single = list(Parser.iter_pgn(get_input.get('fischer_spassky_1992.pgn')))
+    assert 1 == len(single)
+    assert single[0].moves == Parser.from_pgn(get_input.get('fischer_spassky_1992.pgn')).moves
+    assert 43 == len(single[0].moves)
+
+
+def test_parse_san_cache():
+    Parser.parse_san.cache_clear()
+
+    move = Parser.parse_san('Nbd7+', Color.Black)
+    assert move is Parser.parse_san('Nbd7+', Color.Black)
+    assert move is not Parser.parse_san('Nbd7+', Color.White)
+    assert (PieceType.Knight, 'B', None, Point.from_str('d7')) == (move.piece, move.col_helper, move.row_helper,
+                                                                   move.destination)
+
+    # The display record is the parsed record plus its description
+    assert Parser.parse_move('Nbd7+', Color.Black) == Move(*move, action=' moves to ')
+    assert ' captures piece on ' == Parser.parse_move('axb5', Color.White).action
+    assert '' == Parser.parse_move('O-O-O', Color.White).action
+
+    stats = Parser.san_cache_stats()
+    assert 6 == stats['hits'] + stats['misses']
+    assert 2 == stats['hits']
+    assert 4 == stats['size']
+
+    # A long game keeps reusing a small vocabulary
+    Parser.parse_san.cache_clear()
+    for _ in Parser.from_pgn(get_input.get('length8848.5.pgn')).yield_moves():
+        pass
+    stats = Parser.san_cache_stats()
+    assert 2483 == stats['misses'] == stats['size']
+    assert stats['hit_rate'] > 0.85
+
 
 if __name__ == '__main__':
     main()
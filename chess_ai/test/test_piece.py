@@ -4,7 +4,11 @@ from chess_ai.core.Mechanics.point import Point
 from chess_ai.core.Utils.reference import Ref
 from chess_ai.core.Game.board import Board
 from chess_ai.core.Pieces.piece import Piece, King, Queen, Rook, Knight, Bishop, Pawn
-from chess_ai.core.Mechanics.color import Color
+from chess_ai.core.Mechanics.color import Color, get_opposite_color
+from chess_ai.core.Mechanics.move import BoardMove
+from chess_ai.core.Pieces.piece import PieceType
+from chess_ai.core.Utils.pgn_parser import Parser
+from chess_ai.test import get_input
 
 class BoardTester(Board):
     def __init__(self):
@@ -13,6 +17,9 @@ class BoardTester(Board):
     def move_exposes_king(self, piece, move, color):
         return self.move_exposes_king_result
 
+    def occupancy(self, color):
+        return 0
+
 
 class PieceTester(Piece):
     def __init__(self, color, board, pos):
@@ -39,6 +46,12 @@ def perform_move():
     assert p.pos == Point(3, 4)
     assert en_passant() == Point()
 
+def test_pieces_have_no_dict():
+    b = Board()
+    for color in Color:
+        for piece in b.get_team(color):
+            assert not hasattr(piece, '__dict__')
+
 def test_is_valid_move():
     b = BoardTester()
     p = PieceTester(Color.White, b, Point())
@@ -132,5 +145,125 @@ def test_can_not_move_vertically_to_team_piece():
     assert not p._can_move_vertically_to(5)
 
 
+def push_moves(b, moves):
+    for start, end in moves:
+        b.push(BoardMove(Point.from_str(start), Point.from_str(end)))
+        b.invalidate_cache()
+
+
+def valid_moves(b, square):
+    return {move.to_str() for move in b[square].get_all_valid_moves()}
+
+
+def reference_moves(b, piece):
+    '''Plays out every pseudo-legal move and keeps the ones that leave the king safe'''
+    index = piece.pos.x * 8 + piece.pos.y
+    if piece.piece_type == PieceType.King:
+        candidates = [p for p in piece.get_all_valid_moves() if abs(p.y - piece.pos.y) < 2]
+        candidates += [Point(index // 8 + dx, index % 8 + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+        candidates = [p for p in candidates if p.is_valid() and p != piece.pos and
+                      (b[p] is None or b[p].color != piece.color)]
+    else:
+        targets = piece._pseudo_legal_targets(index)
+        candidates = [Point(i // 8, i % 8) for i in range(64) if targets & (1 << i)]
+
+    # Castling is covered by its own test, take it as generated
+    moves = {p for p in piece.get_all_valid_moves() if abs(p.y - piece.pos.y) == 2 and piece.piece_type == PieceType.King}
+    for to in candidates:
+        b.push(BoardMove(piece.pos, to))
+        king = b.get_king(piece.color)
+        if not b.is_attacked(king.pos.x * 8 + king.pos.y, get_opposite_color(piece.color)):
+            moves.add(to)
+        b.pop()
+    return moves
+
+
+def test_valid_moves_in_check():
+    b = Board()
+    push_moves(b, [('E2', 'E4'), ('E7', 'E5'), ('D2', 'D4'), ('F8', 'B4')])
+
+    assert b.get_king(Color.White).in_check
+    assert valid_moves(b, 'C2') == {'C3'}
+    assert valid_moves(b, 'B1') == {'C3', 'D2'}
+    assert valid_moves(b, 'C1') == {'D2'}
+    assert valid_moves(b, 'D1') == {'D2'}
+    assert valid_moves(b, 'E1') == {'E2'}
+    assert valid_moves(b, 'G1') == set()
+    assert valid_moves(b, 'A2') == set()
+
+
+def test_valid_moves_pinned():
+    b = Board()
+    push_moves(b, [('E2', 'E4'), ('E7', 'E5'), ('D2', 'D4'), ('F8', 'B4'), ('B1', 'C3'), ('G8', 'F6')])
+
+    # The knight is pinned to its king by the bishop
+    assert not b.get_king(Color.White).in_check
+    assert valid_moves(b, 'C3') == set()
+
+    # A pinned rook slides along the pin ray only
+    b = Board()
+    push_moves(b, [('E2', 'E4'), ('D7', 'D5'), ('E4', 'D5'), ('D8', 'D5'), ('D1', 'E2'), ('D5', 'E5'),
+                   ('G1', 'F3'), ('E5', 'E4')])
+    assert valid_moves(b, 'E2') == {'E3', 'E4'}
+
+
+def test_valid_moves_castling_and_en_passant():
+    b = Board()
+    push_moves(b, [('E2', 'E4'), ('E7', 'E5'), ('G1', 'F3'), ('B8', 'C6'), ('F1', 'C4'), ('F8', 'C5'),
+                   ('D2', 'D3'), ('G8', 'F6'), ('C1', 'G5'), ('D7', 'D6'), ('B1', 'C3'), ('C8', 'G4'),
+                   ('D1', 'D2'), ('D8', 'D7')])
+    assert valid_moves(b, 'E1') == {'D1', 'E2', 'F1', 'G1', 'C1'}
+
+    # Castling through an attacked square is illegal
+    push_moves(b, [('G5', 'F6'), ('G7', 'F6'), ('A2', 'A3'), ('G4', 'H3')])
+    b.remove_piece('G2')
+    b.invalidate_cache()
+    assert valid_moves(b, 'E1') == {'D1', 'E2', 'C1'}
+
+    b = Board()
+    push_moves(b, [('E2', 'E4'), ('A7', 'A6'), ('E4', 'E5'), ('F7', 'F5')])
+    assert valid_moves(b, 'E5') == {'E6', 'F6'}
+    assert valid_moves(b, 'D2') == {'D3', 'D4'}
+
+
+def test_valid_moves_match_reference():
+    b = Board()
+    moves = [('E2', 'E4'), ('E7', 'E5'), ('G1', 'F3'), ('B8', 'C6'), ('F1', 'B5'), ('A7', 'A6'),
+             ('B5', 'C6'), ('D7', 'C6'), ('E1', 'G1'), ('F7', 'F6'), ('D2', 'D4'), ('E5', 'D4'),
+             ('F3', 'D4'), ('C6', 'C5'), ('D4', 'E6'), ('C8', 'E6'), ('D1', 'D8'), ('E8', 'D8'),
+             ('C1', 'F4'), ('E6', 'A2'), ('A1', 'A2'), ('F8', 'D6'), ('F4', 'D6'), ('C7', 'D6')]
+
+    for start, end in moves:
+        for piece in b.get_team(b.turn):
+            assert set(piece.get_all_valid_moves()) == reference_moves(b, piece)
+        push_moves(b, [(start, end)])
+
+
+def test_targeted_cache_invalidation():
+    b = Board()
+    parser = Parser.from_pgn(get_input.get('raphael_hiaves_2006.pgn'))
+
+    # Resolving moves consults the caches too, only count the hits of the checks below
+    hits = 0
+    for white_move, black_move in parser.yield_moves():
+        for move in (white_move, black_move):
+            if move is None:
+                break
+            piece, to, promotion = b.parse_points_from_move(move)
+            b.perform_move(piece, to, promotion=promotion)
+            b.invalidate_cache_after_move()
+
+            # Whatever survived the invalidation must still be what a fresh generation gives
+            hits -= b.move_cache_stats['hits']
+            for color in Color:
+                for p in b.get_team(color):
+                    assert p.get_all_valid_moves() == p._get_all_valid_moves()
+            hits += b.move_cache_stats['hits']
+
+    stats = b.move_cache_stats
+    assert stats['kept'] > stats['invalidated']
+    assert hits == stats['kept']
+
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
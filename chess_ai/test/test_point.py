@@ -1,7 +1,11 @@
 from pytest import main
 
 
-from chess_ai.core.Mechanics.point import Point, check_bounds
+import pickle
+
+from pytest import raises
+
+from chess_ai.core.Mechanics.point import Point, SQUARES, NONE, OFF_BOARD, check_bounds
 
 
 def test_constructor():
@@ -43,6 +47,29 @@ def test_equals_xy():
     assert not p.equals(2, 3)
 
 
+def test_interned():
+    assert Point(1, 4) is Point(1, 4) is SQUARES[12]
+    assert Point(1, 4).index == 12
+    assert len({Point(x, y) for x in range(8) for y in range(8)}) == 64
+    assert Point(1, 2) != Point(2, 1)
+
+    assert Point() is NONE
+    assert Point(-1, 0) is Point(8, 3) is OFF_BOARD
+    assert NONE != OFF_BOARD
+    assert NONE.index == OFF_BOARD.index == -1
+
+    assert pickle.loads(pickle.dumps(Point(6, 2))) is Point(6, 2)
+
+    with raises(AttributeError):
+        Point(1, 4).x = 2
+
+def test_from_str():
+    assert Point.from_str('E4') is Point.from_str('e4') is Point(3, 4)
+    assert Point.from_str('E4').to_str() == 'E4'
+    assert Point.from_str('I4') is OFF_BOARD
+    assert Point.from_str('E') is NONE
+    assert Point.from_str('EE') is NONE
+
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,53 @@
+import shutil
+from pytest import main
+
+from chess_ai.core import replay
+from chess_ai.core.Mechanics.status import Status
+from chess_ai.core.Utils.pgn_parser import Parser
+from chess_ai.test import get_input
+
+
+def without_timing(results):
+    return [result._replace(seconds=0.0) for result in results]
+
+
+def test_replay_game():
+    result = replay.replay_game(Parser.from_pgn(get_input.get('raphael_hiaves_2006.pgn')))
+
+    assert result.ok
+    assert 40 == result.plies
+    assert Status.Checkmate == result.status
+    assert 'Raphael' == result.headers['White']
+
+
+def test_replay_pgn(tmp_path):
+    fp = str(tmp_path / 'games.pgn')
+    shutil.copy(get_input.get('multi_game.pgn'), fp)
+    with open(fp, 'a') as f:
+        f.write('\n[Event "Illegal"]\n\n1. e4 e5 2. Ke3 *\n')
+
+    results = list(replay.replay_pgn(fp, jobs=1))
+    assert [0, 1, 2, 3, 4] == [result.game for result in results]
+    assert [7, 5, 3, 4, 2] == [result.plies for result in results]
+    assert [Status.Checkmate, Status.InProgress, Status.InProgress, Status.Checkmate, Status.InProgress] == \
+            [result.status for result in results]
+
+    assert all(result.ok for result in results[:4])
+    assert not results[4].ok
+    assert 'Ke3' == results[4].error_san
+    assert "IllegalMove: The White King can't move to E3: Ke3" == results[4].error
+
+    # Spread over worker processes, in small chunks, the results come back the same and in order
+    assert without_timing(results) == without_timing(replay.replay_pgn(fp, jobs=2, chunk_size=2))
+
+
+def test_main(tmp_path, capsys):
+    fp = str(tmp_path / 'games.pgn')
+    shutil.copy(get_input.get('multi_game.pgn'), fp)
+
+    assert 0 == replay.main([fp, '--jobs', '2'])
+    assert '4 games  19 plies  0 failed' in capsys.readouterr().out
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+from pytest import main
+
+from chess_ai.core.Game.board import Board
+from chess_ai.core.Search import search
+from chess_ai.core.perft import move_str, parse_move_str
+
+
+def test_mate_in_one():
+    board = Board.from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+    result = search.search(board, 3)
+
+    assert move_str(result.best_move) == 'a1a8'
+    assert result.score == search.MATE_SCORE - 1
+    assert search.format_score(result.score) == 'mate 1'
+    # The quiescence search sees the mate from the first iteration, which ends the deepening
+    assert result.depth == 1
+
+
+def test_mated():
+    board = Board.from_fen('R5k1/5ppp/8/8/8/8/8/6K1 b - - 0 1')
+    result = search.search(board, 2)
+
+    assert result.best_move is None
+    assert result.score == -search.MATE_SCORE
+
+
+def test_stalemate():
+    board = Board.from_fen('k7/8/1Q6/8/8/8/8/6K1 b - - 0 1')
+    assert search.search(board, 2).score == 0
+
+
+def test_wins_hanging_queen():
+    board = Board.from_fen('4k3/8/8/3q4/8/8/3R4/4K3 w - - 0 1')
+    result = search.search(board, 2)
+
+    assert move_str(result.best_move) == 'd2d5'
+    # A rook up, give or take where the pieces end up
+    assert 400 < result.score < 600
+
+
+def test_search_restores_board():
+    board = Board.from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+    fen = board.to_fen()
+    key = board.zobrist_key
+
+    result = search.search(board, 3)
+
+    assert board.to_fen() == fen
+    assert board.zobrist_key == key == board._compute_zobrist_key()
+    assert result.depth == 3
+    assert result.nodes > 0 and result.nps > 0
+
+    # The principal variation is a line of legal moves, starting with the best move
+    assert result.pv[0] == result.best_move
+    for move in result.pv:
+        board.invalidate_cache()
+        assert move in board.legal_moves()
+        board.push(move)
+
+
+def test_node_limit():
+    board = Board.from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+    fen = board.to_fen()
+
+    result = search.search(board, 10, node_limit=2000)
+
+    # The iteration that ran out is dropped, the one before it stands
+    assert 1 <= result.depth < 10
+    assert result.best_move is not None
+    assert board.to_fen() == fen
+
+
+def test_repetition():
+    board = Board.from_fen('4k3/8/8/8/8/8/8/4K2R w - - 0 1')
+    assert not board.is_repetition()
+
+    for move in ('h1h2', 'e8d8', 'h2h1', 'd8e8'):
+        board.push(parse_move_str(move))
+    assert board.is_repetition()
+
+    board.push(parse_move_str('h1h2'))
+    assert board.is_repetition()
+
+    # Nothing before a pawn move or capture can repeat
+    board = Board.from_fen('4k3/8/8/8/8/8/8/4K2R w - - 7 1')
+    for move in ('h1h2', 'e8d8', 'h2h1', 'd8e8'):
+        board.push(parse_move_str(move))
+    board.halfmove_clock = 3
+    assert not board.is_repetition()
+
+
+if __name__ == '__main__':
+    main()
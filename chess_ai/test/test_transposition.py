@@ -0,0 +1,101 @@
+from pytest import main
+
+from chess_ai.core.Game.board import Board
+from chess_ai.core.Pieces.piece import PieceType
+from chess_ai.core.Search import search
+from chess_ai.core.Search.transposition import Bound, TranspositionTable, decode_move, encode_move
+from chess_ai.core.perft import parse_move_str
+
+
+def test_size():
+    table = TranspositionTable(1)
+    assert len(table) == 65536
+    assert table.mb == 1
+
+    # Rounded down to a power of two buckets
+    assert len(TranspositionTable(3)) == len(TranspositionTable(2)) == 131072
+    assert len(TranspositionTable(0)) == 2
+
+
+def test_move_encoding():
+    for s in ('a1h8', 'e7e8q', 'b2a1n', 'h7h8r', 'c7c8b'):
+        move = parse_move_str(s)
+        assert decode_move(encode_move(move)) == move
+    assert decode_move(encode_move(None)) is None
+
+
+def test_store_probe():
+    table = TranspositionTable(1)
+    key = 0x123456789abcdef0
+    assert table.probe(key) is None
+
+    move = parse_move_str('a7a8q')
+    table.store(key, 5, Bound.Lower, -1234, move)
+    entry = table.probe(key)
+    assert entry.depth == 5
+    assert entry.bound == Bound.Lower
+    assert entry.score == -1234
+    assert entry.move == move
+    assert entry.move.promotion == PieceType.Queen
+
+    # Failing low finds no best move, the one found before is kept
+    table.store(key, 6, Bound.Upper, 50, None)
+    entry = table.probe(key)
+    assert (entry.depth, entry.bound, entry.score, entry.move) == (6, Bound.Upper, 50, move)
+
+    # Another position with the same low bits of its key misses
+    assert table.probe(key ^ 1 << 40) is None
+    assert table.stats()['hits'] == 2
+    assert table.stats()['probes'] == 4
+
+
+def test_replacement():
+    table = TranspositionTable(1)
+    deep, shallow, other = 7, 7 | 1 << 32, 7 | 2 << 32
+
+    table.store(deep, 8, Bound.Exact, 10, None)
+    # A shallower search of another position goes to the always-replace slot, and only evicts from there
+    table.store(shallow, 2, Bound.Exact, 20, None)
+    table.store(other, 3, Bound.Exact, 30, None)
+    assert table.probe(deep).score == 10
+    assert table.probe(shallow) is None
+    assert table.probe(other).score == 30
+    assert table.collisions == 1
+
+    # A later search takes the depth-preferred slot over
+    table.new_search()
+    table.store(shallow, 1, Bound.Exact, 40, None)
+    assert table.probe(deep) is None
+    assert table.probe(shallow).score == 40
+    assert table.collisions == 2
+
+    table.clear()
+    assert table.probe(shallow) is None
+    assert table.stats()['usage'] == 0
+
+
+def test_search_with_table():
+    fen = 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10'
+    table = TranspositionTable(1)
+    result = search.Searcher(Board.from_fen(fen), table).search(3)
+
+    # The smallest table hardly holds anything, but has to find the same
+    tiny = search.Searcher(Board.from_fen(fen), TranspositionTable(0)).search(3)
+    assert (result.score, result.best_move) == (tiny.score, tiny.best_move)
+    assert table.hits > 0
+
+    # Searching the same position again comes straight out of the table
+    again = search.Searcher(Board.from_fen(fen), table).search(3)
+    assert again.score == result.score
+    assert again.nodes < result.nodes
+
+
+def test_mate_scores_through_table():
+    board = Board.from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+    table = TranspositionTable(1)
+    assert search.Searcher(board, table).search(3).score == search.MATE_SCORE - 1
+    assert search.Searcher(board, table).search(3).score == search.MATE_SCORE - 1
+
+
+if __name__ == '__main__':
+    main()